@@ -0,0 +1,653 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 09:12:40
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : AsyncWkMysql.py
+# @Brief    : WkMysql的asyncio版本
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+async def main():
+    async with AsyncWkMysql(host=HOST, user=USER, password=PASSWORD, database=DATABASE) as db:
+        db.set_table(TABLE)
+        await db.insert_row({"key": "1", "sno": "2", "role": "3"})
+        print(await db.select_all())
+
+asyncio.run(main())
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+import reprlib
+import sys
+import time
+import traceback
+from WkLog import WkLog, DEBUG, ERROR
+from .SqlTemplateCache import SqlTemplateCache, sql_template_cache
+from .RowFormat import ROW_FORMATS, get_row_factory
+
+try:
+    import aiomysql
+except ImportError:  # 可选依赖: pip install WkMysql[async]
+    aiomysql = None
+
+
+class AsyncWkMysql:
+    sql_cache: SqlTemplateCache = sql_template_cache  # SQL模板缓存，默认所有实例共用
+
+    def __init__(
+        self,
+        host,
+        user,
+        password,
+        database,
+        port=3306,
+        time_interval=60,  # 距离上次交互超过该时间(秒)时，执行前先ping一次，目的是保持连接不断开
+        log_level=None,  # 日志等级，例如 "INFO"，None表示使用WkLog的默认配置
+        quiet=False,  # 安静模式：不输出每次操作成功的日志，失败日志照常输出
+        log_max_values=10,  # 日志中最多输出多少个参数值，超出部分用...代替
+        row_format="dict",  # 查询结果的行格式: dict/tuple/namedtuple/record，查询时也可以单独指定
+        **kwargs,
+    ):
+        if aiomysql is None:
+            raise ImportError("AsyncWkMysql requires aiomysql, please run: pip install aiomysql")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.port = port
+        self.time_interval = time_interval
+        self.kwargs = kwargs
+
+        self.table: str = None
+        self.row_format: str = self.__check_row_format(row_format)
+        self.last_connect_time = None  # 上次连接时间
+        self.close_flag: bool = False
+
+        self.quiet: bool = quiet
+        self._log = WkLog()
+        if log_level is not None:
+            self._log.set_level(log_level)
+        self._repr = reprlib.Repr()
+        self._repr.maxlist = self._repr.maxtuple = self._repr.maxdict = log_max_values
+        self._repr.maxstring = self._repr.maxother = 100
+        self.lock = asyncio.Lock()
+        self._in_transaction: bool = False
+        self._transaction_task: asyncio.Task = None  # 正在执行事务的任务，asyncio.Lock不可重入，该任务在事务范围内调用方法时不再加锁
+
+        self.conn: aiomysql.Connection = None  # 第一次执行时再建立连接，也可以手动 await connect()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        async with self.lock:
+            if self.conn is None:
+                self.conn = await self.connect_db()
+        return self
+
+    async def connect_db(self) -> "aiomysql.Connection":
+        try:
+            conn = await aiomysql.connect(
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                db=self.database,
+                port=self.port,
+                autocommit=True,
+                **self.kwargs,
+            )
+            self._log.debug("Successfully connected to database!")
+            self.last_connect_time = time.time()
+            self.close_flag = False
+            return conn
+        except Exception as e:
+            msg = f"Failed to connect to database! -> {str(e)}"
+            self._log.error(msg)
+            raise Exception(msg)
+
+    async def close(self):
+        self._log.debug("Close database connection!")
+        async with self.lock:
+            try:
+                if self.close_flag or self.conn is None:
+                    return
+                await self.conn.ensure_closed()
+                self.close_flag = True
+            except Exception as e:
+                self.conn.close()
+                self.close_flag = True
+                self._log.error(f"Failed to close database connection! -> {str(e)}")
+
+    def before_execute(func):
+        async def wrapper(self, *args, **kwargs):
+            if self.table is None:
+                raise Exception("table is not set!")
+            if self._in_transaction and self._transaction_task is asyncio.current_task():
+                await self.__test_conn()
+                return await func(self, *args, **kwargs)
+            async with self.lock:
+                await self.__test_conn()
+                result = await func(self, *args, **kwargs)
+            return result
+
+        return wrapper
+
+    async def __commit(self):
+        """连接默认开启autocommit，每条语句已经自动提交，不再发送多余的COMMIT；事务中推迟到事务结束时统一提交"""
+        if self._in_transaction or self.conn.get_autocommit():
+            return
+        await self.conn.commit()
+
+    async def __rollback(self):
+        """autocommit模式下没有需要回滚的内容；事务中由transaction()统一回滚"""
+        if self._in_transaction or self.conn.get_autocommit():
+            return
+        await self.conn.rollback()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        事务范围：范围内的所有操作在同一个事务中执行，正常退出时只提交一次，出现异常时回滚并抛出异常
+        - 范围内的方法出错时不再返回-1/False/None，而是直接抛出异常
+        - 范围内持有连接锁，只能在当前任务中使用，其他任务使用同一个实例时会等待事务结束
+        - 嵌套调用时并入外层事务
+        - demo:
+            - async with db.transaction():
+                  await db.set_table("account").update({"id": 1}, {"balance": 90})
+                  await db.set_table("account").update({"id": 2}, {"balance": 110})
+        """
+        if self._in_transaction and self._transaction_task is asyncio.current_task():
+            yield self
+            return
+        async with self.lock:
+            await self.__test_conn()
+            await self.conn.begin()
+            self._in_transaction = True
+            self._transaction_task = asyncio.current_task()
+            try:
+                yield self
+                await self.conn.commit()
+                self._log.debug("Transaction committed!")
+            except BaseException:
+                try:
+                    await self.conn.rollback()
+                    self._log.debug("Transaction rolled back!")
+                except Exception as e:
+                    self._log.error(f"Failed to rollback transaction! -> {str(e)}")
+                raise
+            finally:
+                self._in_transaction = False
+                self._transaction_task = None
+
+    async def __test_conn(self):
+        """
+        长连接时，如果长时间不进行数据库交互，连接就会关闭，再次请求就会报错
+        与WkMysql不同，这里不启动后台线程，而是在执行前检查距离上次交互的时间，超时则ping一次
+        """
+        if self.conn is None or self.close_flag:
+            self.conn = await self.connect_db()
+            return
+        try:
+            current_time = time.time()
+            if current_time - self.last_connect_time >= self.time_interval:
+                self._log.debug("__test_conn")
+                await self.conn.ping(reconnect=False)
+            self.last_connect_time = current_time
+        except:
+            print(traceback.format_exc())
+            if self._in_transaction:  # 重新连接会丢失事务
+                raise
+            self.conn = await self.connect_db()
+
+    def __get_values(self, obj: dict | list):
+        if isinstance(obj, dict):
+            return list(obj.values())
+        elif isinstance(obj, list):
+            res = []
+            for o in obj:
+                res.append(self.__get_values(o))
+            return res
+
+    def __validate_args(self, args, kwargs):
+        """
+        验证参数是否正确
+        """
+        if not args and not kwargs:
+            raise Exception("args or kwargs must be used!")
+        if args and kwargs:
+            raise Exception("args and kwargs cannot be used together!")
+        if args:
+            if len(args) > 1 or not isinstance(args[0], dict):
+                raise Exception("args's length must be 1 and the type must be dict!")
+
+    def __check_row_format(self, row_format):
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
+        return row_format
+
+    def __package_data(self, data: list | tuple | None, cursor, row_format=None):
+        """用来封装数据: 按照row_format把数据封装为字典/元组/具名元组/record对象"""
+        row_format = self.__check_row_format(row_format or self.row_format)
+        try:
+            if data is None:
+                return None
+            if row_format == "tuple":  # 不做任何转换
+                return data
+
+            column_names = tuple([desc[0] for desc in cursor.description])  # 获取列名
+            factory = get_row_factory(row_format, column_names)
+            if type(data) == list:
+                return [factory(d) for d in data]
+            elif type(data) == tuple:
+                return factory(data)
+            else:
+                raise TypeError("data类型错误，应为列表或元组")
+        except Exception as e:
+            self._log.error(f"封装数据失败 -> {str(e)}")
+            return None
+
+    def __print_info(self, func_name, sql=None, values=None, success=True, error_msg=None, cursor=None):
+        """
+        日志只有在对应等级开启时才会拼接，参数值会被截断，避免批量操作时把所有数据都转成字符串
+        """
+        if success:
+            if self.quiet or self._log.level > DEBUG:
+                return
+            self._log.debug(f"Success: {func_name} -> {sql} -> {self._repr.repr(values)} -> Rows affected: {cursor.rowcount}")
+        else:
+            if self._log.level > ERROR:
+                return
+            self._log.error(f"Failure: {func_name} -> {sql} -> {self._repr.repr(values)} -> {error_msg}")
+
+    def set_table(self, table):
+        self.table = table
+        return self
+
+    @asynccontextmanager
+    async def get_cursor(self):
+        cursor = await self.conn.cursor()
+        try:
+            yield cursor
+        except Exception as e:
+            await self.__rollback()
+            raise e
+        finally:
+            await cursor.close()
+
+    async def create_table(self, obj: dict, delete_if_exists=False):
+        """
+        创建表
+        :param obj: 字典对象，键为列名，值为列类型
+        :param delete_if_exists: 是否删除原有表
+        :return: True/False
+        """
+        if delete_if_exists:
+            await self.delete_table()
+        return await self.__create_table(obj)
+
+    @before_execute
+    async def __create_table(self, obj: dict):
+        col_params = ", ".join([f"`{column_name}` {column_type}" for column_name, column_type in obj.items()])
+        sql = f"CREATE TABLE IF NOT EXISTS {self.table} ({col_params})"
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql)
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, cursor=cursor)
+                return True
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return False
+
+    @before_execute
+    async def delete_table(self):
+        """
+        删除表
+        :return: True/False
+        """
+        sql = f"DROP TABLE IF EXISTS {self.table}"
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql)
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, cursor=cursor)
+                return True
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return False
+
+    @before_execute
+    async def get_column_names(self):
+        sql = "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s"
+        try:
+            values = (self.database, self.table)
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                res = []
+                for row in await cursor.fetchall():
+                    res.append(row[0])
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+            return res
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return []
+
+    @before_execute
+    async def exists(self, *args, **kwargs):
+        """
+        根据字典对象判断元素是否存在
+        - demo:
+            - await exists({"id": 1, "name": "wangkang"})
+            - await exists(id=1, name=wangkang)
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("exists", self.table, where=obj)
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                flag = await cursor.fetchone() != None
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return flag
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return False
+
+    @before_execute
+    async def insert_row(self, *args, **kwargs):
+        """
+        插入一行数据
+        :return: (rowcount, insert_id) / -1
+        - demo:
+            - await insert_row({"id": 1, "name": "wangkang"})
+            - await insert_row(id=1, name=wangkang)
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("insert", self.table, columns=obj.keys())
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount, cursor.lastrowid
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    async def insert_rows(self, obj_list: list[dict]):
+        """
+        插入多行数据，不会因为个别数据的添加失败导致后面的所有数据都插入失败
+        :param obj_list: 列表，元素为字典对象，键为列名，值为列值
+        :return: 字典对象，键为success和fail，值为成功和失败次数
+        """
+        if not obj_list:
+            return None
+        success = 0
+        fail = 0
+        for obj in obj_list:
+            res = await self.insert_row(obj)
+            if res != -1 and res[0] > 0:
+                success += 1
+            else:
+                fail += 1
+        return {"success": success, "fail": fail}
+
+    @before_execute
+    async def insert_many(self, obj_list: list[dict]):
+        """
+        使用executemany来批量插入数据 此操作具有原子性
+        obj_list: 列表，元素为字典对象，键为列名，值为列值
+        :return: rowcount/False
+        """
+        if not obj_list:
+            self._log.warn("要插入的数据为空!")
+            return
+        values = self.__get_values(obj_list)
+        sql = self.sql_cache.get("insert", self.table, columns=obj_list[0].keys())
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.executemany(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return False
+
+    @before_execute
+    async def delete_row(self, *args, **kwargs):
+        """
+        根据条件删除一行数据
+        - demo:
+            - await delete_row({"id": 1, "name": "wangkang"})
+            - await delete_row(id=1, name=wangkang)
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("delete", self.table, where=obj)
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    async def delete_rows(self, obj_list: list):
+        """
+        :param obj_list: 列表，元素为字典对象，键为列名，值为列值
+        :return: 字典对象，键为success和fail，值为成功和失败次数
+        """
+        if not obj_list:
+            return None
+        success = 0
+        fail = 0
+        for obj in obj_list:
+            if await self.delete_row(obj) > 0:
+                success += 1
+            else:
+                fail += 1
+        return {"success": success, "fail": fail}
+
+    @before_execute
+    async def delete_many(self, obj_list: list[dict]):
+        """
+        使用executemany来批量删除数据 此操作具有原子性
+        :param obj_list: 列表，元素为字典对象，键为列名，值为列值
+        :return: rowcount/-1
+        """
+        if not obj_list:
+            self._log.warn("要删除的数据为空!")
+            return
+        values = self.__get_values(obj_list)
+        sql = self.sql_cache.get("delete", self.table, where=obj_list[0])
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.executemany(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    @before_execute
+    async def select_all(self, row_format=None):
+        """
+        查询所有数据
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 列表，元素默认为字典对象，键为列名，值为列值
+        """
+        sql = f"SELECT * FROM {self.table}"
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql)
+                data = await cursor.fetchall()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, cursor=cursor)
+                return self.__package_data(list(data), cursor, row_format)
+        except Exception as e:
+            print(traceback.format_exc())
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return None
+
+    @before_execute
+    async def select(self, *args, row_format=None, **kwargs):
+        """
+        根据条件进行查询
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 列表，元素默认为字典对象，键为列名，值为列值
+        - demo:
+            - await select({"id": 1, "name": "wangkang"})
+            - await select(id=1, name=wangkang)
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("select", self.table, where=obj)
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                data = await cursor.fetchall()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return self.__package_data(list(data), cursor, row_format)
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return None
+
+    @before_execute
+    async def select_one(self, *args, row_format=None, **kwargs):
+        """
+        根据条件进行查询，只返回第一条数据
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 默认为字典对象，键为列名，值为列值
+        - demo:
+            - await select_one({"id": 1, "name": "wangkang"})
+            - await select_one(id=1, name=wangkang)
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("select_one", self.table, where=obj)
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                data = await cursor.fetchone()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return self.__package_data(data, cursor, row_format)
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return None
+
+    @before_execute
+    async def update(self, target_obj: dict, new_obj: dict):
+        """
+        根据条件更新数据
+        :param target_obj: 字典对象，键为列名，值为列值 作为更新条件
+        :param new_obj: 字典对象，键为列名，值为列值 作为更新内容
+        :return: rowcount/-1
+        """
+        values = self.__get_values(new_obj) + self.__get_values(target_obj)
+        sql = self.sql_cache.get("update", self.table, where=target_obj, columns=new_obj.keys())
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    @before_execute
+    async def execute(self, sql, values=None):
+        """
+        执行SQL语句
+        :param sql: SQL语句
+        :param values: 列表，元素为SQL语句中占位符对应的值
+        :return: 影响行数
+        """
+        try:
+            async with self.get_cursor() as cursor:
+                if values is None:
+                    await cursor.execute(sql)
+                else:
+                    await cursor.execute(sql, values)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    @before_execute
+    async def execute_many(self, sql, values_list):
+        """
+        批量执行SQL语句
+        :param sql: SQL语句
+        :param values_list: 列表，元素为列表，每个子列表为SQL语句中占位符对应的值
+        :return: 影响行数
+        """
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.executemany(sql, values_list)
+                await self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values_list, cursor=cursor)
+                return cursor.rowcount
+        except Exception as e:
+            await self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values_list, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 10:02:16
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : AsyncWkMysqlPool.py
+# @Brief    : AsyncWkMysql连接池
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+async def main():
+    async with AsyncWkMysqlPool(host=HOST, user=USER, password=PASSWORD, database=DATABASE, port=PORT) as pool:
+        async with pool.acquire(timeout=3) as conn:
+            print(await conn.set_table(TABLE).select_all())
+
+asyncio.run(main())
+"""
+
+from .AsyncWkMysql import AsyncWkMysql
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from WkLog import WkLog
+
+
+class AsyncWkMysqlPool:
+    def __init__(
+        self,
+        host,
+        user,
+        password,
+        database,
+        port,
+        min_conn=3,
+        max_conn=10,
+        max_idle_timeout=60 * 60,  # 最大空闲超时：1小时
+        max_waiters=None,  # 最大排队协程数，超过后直接抛出异常(快速失败)，None表示不限制
+        **kwargs,
+    ):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.port = port
+        self.max_conn: int = max_conn  # 最大连接数
+        self.min_conn: int = min_conn  # 最小连接数
+        self.max_idle_timeout: int = max_idle_timeout  # 单位：秒
+        self.max_waiters = max_waiters
+        self.kwargs = kwargs
+
+        self._log = WkLog()
+
+        self.pool: deque = deque()  # 空闲连接 (conn, last_use_time)，右端为最近归还的连接
+        self.waiters: deque = deque()  # 等待连接的协程，先进先出
+        self.current_conn = 0  # 当前连接数(空闲 + 使用中 + 正在创建)
+        self.close_flag = False
+        self._init_flag = False
+        self._cleanup_task: asyncio.Task = None
+
+    async def __aenter__(self):
+        await self.init_pool()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def init_pool(self):
+        if self._init_flag:
+            return self
+        self._init_flag = True
+        self.current_conn += self.min_conn
+        results = await asyncio.gather(*[self._create_connection() for _ in range(self.min_conn)], return_exceptions=True)
+        for res in results:
+            if isinstance(res, Exception):
+                self.current_conn -= 1
+                self._log.error(f"Failed to create initial connection: {res}")
+                continue
+            self.pool.append((res, time.time()))
+        # 启动空闲连接清理任务
+        self._cleanup_task = asyncio.get_running_loop().create_task(self.cleanup_idle_connections())
+        return self
+
+    async def _create_connection(self) -> AsyncWkMysql:
+        conn = AsyncWkMysql(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            port=self.port,
+            **self.kwargs,
+        )
+        return await conn.connect()
+
+    def qsize(self):
+        return len(self.pool)
+
+    async def _get_connection(self, timeout=None) -> AsyncWkMysql:
+        if self.close_flag:
+            raise Exception("pool is closed!")
+        if not self._init_flag:
+            await self.init_pool()
+
+        # 只有在没有协程排队时才允许直接拿连接，避免插队
+        if not self.waiters:
+            if self.pool:
+                conn, _ = self.pool.pop()
+                return conn
+            if self.current_conn < self.max_conn:
+                return await self._new_connection()
+
+        if self.max_waiters is not None and len(self.waiters) >= self.max_waiters:
+            raise TimeoutError(f"Pool exhausted: {len(self.waiters)} coroutines are already waiting for a connection!")
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            conn = await asyncio.wait_for(fut, timeout)
+        except BaseException as e:
+            # 超时或调用者被取消时，如果已经分到了连接/名额，需要还回去
+            # Python 3.12+ 的wait_for基于asyncio.timeout，转交和超时可能发生在同一轮事件循环中
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._give_back(fut.result())
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(f"Timed out after {timeout}s waiting for a connection! (max_conn={self.max_conn})")
+            raise
+        finally:
+            if fut in self.waiters:
+                self.waiters.remove(fut)
+        if conn is None:  # 有连接被关闭，空出的名额直接转交给了当前协程
+            return await self._new_connection(reserved=True)
+        return conn
+
+    async def _new_connection(self, reserved=False) -> AsyncWkMysql:
+        if not reserved:
+            self.current_conn += 1  # 先占位，防止并发创建超过max_conn
+        try:
+            return await self._create_connection()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def _wakeup_waiter(self, conn: AsyncWkMysql | None):
+        """
+        把连接直接交给排在最前面的协程，conn为None时表示转交一个连接名额
+        :return: 是否有协程接收
+        """
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(conn)
+                return True
+        return False
+
+    def _release_slot(self):
+        """释放一个连接名额：优先转交给等待者，没有等待者时才减少连接数"""
+        if self.close_flag or not self._wakeup_waiter(None):
+            self.current_conn -= 1
+
+    def _give_back(self, conn: AsyncWkMysql | None):
+        if conn is None:
+            self._release_slot()
+        else:
+            self.release_connection(conn)
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        """
+        获取一个连接
+        :param timeout: 最长等待时间(秒)，None表示一直等待，超时抛出TimeoutError
+        - demo:
+            - async with pool.acquire(timeout=3) as conn: ...
+        """
+        conn = await self._get_connection(timeout)
+        try:
+            yield conn  # 提供连接给调用者
+        finally:
+            # 在上下文退出后释放连接
+            self.release_connection(conn)
+
+    @asynccontextmanager
+    async def transaction(self, timeout=None):
+        """
+        获取一个连接并开启事务，正常退出时提交一次，出现异常时回滚并抛出异常
+        - demo:
+            - async with pool.transaction() as conn:
+                  await conn.set_table("account").update({"id": 1}, {"balance": 90})
+                  await conn.set_table("account").update({"id": 2}, {"balance": 110})
+        """
+        async with self.acquire(timeout) as conn, conn.transaction():
+            yield conn
+
+    def release_connection(self, conn: AsyncWkMysql):
+        if self.close_flag:
+            asyncio.get_running_loop().create_task(self.close_connection(conn))
+            return
+        if conn.close_flag:  # 连接已经被关闭，空出名额
+            self._release_slot()
+            return
+        if not self._wakeup_waiter(conn):
+            self.pool.append((conn, time.time()))
+
+    async def close_connection(self, conn: AsyncWkMysql):
+        try:
+            await conn.close()  # 关闭空闲连接
+        except Exception as e:
+            self._log.error(f"Failed to close connection: {e}")
+        finally:
+            self._release_slot()
+
+    async def cleanup_idle_connections(self):
+        while not self.close_flag:
+            await asyncio.sleep(self.max_idle_timeout)
+            self._log.debug("cleanup_idle_connections")
+            now = time.time()
+            # 最久未使用的连接在左端，原地回收，不会清空连接池
+            while self.pool and self.current_conn > self.min_conn:
+                conn, last_use_time = self.pool[0]
+                if now - last_use_time <= self.max_idle_timeout:
+                    break
+                self.pool.popleft()
+                await self.close_connection(conn)
+                self._log.debug(f"Closed idle connection: {conn}")
+
+    async def close(self):
+        if self.close_flag:
+            return
+        self.close_flag = True
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_exception(Exception("pool is closed!"))
+        while self.pool:
+            conn, _ = self.pool.popleft()
+            await self.close_connection(conn)
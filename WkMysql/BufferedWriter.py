@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 18:25:43
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : BufferedWriter.py
+# @Brief    : 缓冲批量写入
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+pool = WkMysqlPool(...)
+writer = BufferedWriter(pool, batch_size=1000, max_latency=0.5)
+writer.write("events", {"type": "click", "user_id": 1})  # 只放入内存缓冲区，立即返回
+writer.flush()  # 把缓冲区中的数据全部写入数据库后返回
+writer.close()  # 程序退出时也会自动调用
+"""
+
+import atexit
+import time
+from threading import Condition, Lock, Thread
+from WkLog import WkLog
+
+
+def _row_size(values):
+    """估算一行数据在SQL语句中占用的字节数，用于按字节数触发写入"""
+    size = 0
+    for value in values:
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value) + 4  # 引号、转义和分隔符
+        else:
+            size += 12
+    return size
+
+
+class _Buffer:
+    __slots__ = ("table", "columns", "rows", "bytes", "first_time")
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns
+        self.rows = []
+        self.bytes = 0
+        self.first_time = time.monotonic()  # 缓冲区中最早一行数据的时间
+
+
+class BufferedWriter:
+    """
+    在内存中按 (表名, 列名) 缓冲要插入的行，由后台线程调用 insert_many 批量写入:
+    - 某个缓冲区达到batch_size行或max_bytes字节时立即写入
+    - 缓冲区中最早的数据超过max_latency秒时写入
+    - 缓冲的总行数达到max_buffered_rows时，write会阻塞等待(背压)，避免写入速度跟不上时内存无限增长
+    :param db: WkMysqlPool，或者WkMysql(只能由BufferedWriter使用，因为写入时会调用set_table)
+    :param on_error: 可选，写入失败时调用 on_error(table, rows, error)，默认只输出日志
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size=1000,
+        max_bytes=1024 * 1024,
+        max_latency=1.0,  # 单位：秒
+        max_buffered_rows=100000,
+        on_error=None,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.max_buffered_rows = max_buffered_rows
+        self.on_error = on_error
+
+        self._log = WkLog()
+        self._cond = Condition()
+        self._flush_lock = Lock()  # 同一时间只有一个线程在写数据库，flush()拿到锁时说明之前取出的数据都已经写完
+        self._buffers: dict[tuple, _Buffer] = {}
+        self._buffered_rows = 0
+        self._closed = False
+        self._counters = {"rows_written": 0, "batches": 0, "failed_rows": 0, "blocked": 0}
+
+        self._thread = Thread(target=self._run, name="WkMysql-BufferedWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, table, *args, timeout=None, **kwargs):
+        """
+        把一行数据放入缓冲区
+        :param timeout: 缓冲区已满时最长等待时间(秒)，None表示一直等待，超时抛出TimeoutError
+        - demo:
+            - write("events", {"type": "click", "user_id": 1})
+            - write("events", type="click", user_id=1)
+        """
+        obj = args[0] if args else kwargs
+        if not isinstance(obj, dict) or not obj:
+            raise Exception("row must be a non-empty dict!")
+        columns = tuple(obj.keys())
+        values = tuple(obj.values())
+        with self._cond:
+            if self._closed:
+                raise Exception("BufferedWriter is closed!")
+            if self._buffered_rows >= self.max_buffered_rows:
+                self._counters["blocked"] += 1
+                if not self._cond.wait_for(lambda: self._buffered_rows < self.max_buffered_rows or self._closed, timeout):
+                    raise TimeoutError(f"BufferedWriter is full ({self.max_buffered_rows} rows)")
+                if self._closed:
+                    raise Exception("BufferedWriter is closed!")
+            buffer = self._buffers.get((table, columns))
+            if buffer is None:
+                buffer = self._buffers[(table, columns)] = _Buffer(table, columns)
+                self._cond.notify_all()  # 新的缓冲区，后台线程需要重新计算超时时间
+            buffer.rows.append(values)
+            buffer.bytes += _row_size(values)
+            self._buffered_rows += 1
+            if len(buffer.rows) >= self.batch_size or buffer.bytes >= self.max_bytes:
+                self._cond.notify_all()
+
+    def _take(self, force=False):
+        """取出需要写入的缓冲区，调用时需要持有self._cond"""
+        now = time.monotonic()
+        ready = []
+        for key, buffer in list(self._buffers.items()):
+            if force or len(buffer.rows) >= self.batch_size or buffer.bytes >= self.max_bytes or now - buffer.first_time >= self.max_latency:
+                ready.append(self._buffers.pop(key))
+                self._buffered_rows -= len(buffer.rows)
+        if ready:
+            self._cond.notify_all()  # 唤醒因为背压而等待的write
+        return ready
+
+    def _has_ready(self):
+        """是否有缓冲区已经达到写入条件，调用时需要持有self._cond"""
+        now = time.monotonic()
+        for buffer in self._buffers.values():
+            if len(buffer.rows) >= self.batch_size or buffer.bytes >= self.max_bytes or now - buffer.first_time >= self.max_latency:
+                return True
+        return False
+
+    def _next_deadline(self):
+        """:return: 距离最早一个缓冲区超时的秒数，没有数据时返回None"""
+        if not self._buffers:
+            return None
+        first_time = min([buffer.first_time for buffer in self._buffers.values()])
+        return max(0, first_time + self.max_latency - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 先检查再等待：写数据库期间缓冲区可能已经写满，那次notify不会被收到
+                while not self._closed and not self._has_ready():
+                    self._cond.wait(self._next_deadline())
+                if self._closed:
+                    return
+            try:
+                with self._flush_lock:
+                    with self._cond:
+                        ready = self._take()
+                    self._write(ready)
+            except Exception as e:  # 后台线程只有一个，任何异常都不能让它退出
+                self._log.error(f"BufferedWriter flush failed -> {str(e)}")
+
+    def _write(self, buffers: list[_Buffer]):
+        for buffer in buffers:
+            for i in range(0, len(buffer.rows), self.batch_size):
+                self._insert(buffer.table, buffer.columns, buffer.rows[i : i + self.batch_size])
+
+    def _insert(self, table, columns, rows):
+        obj_list = [dict(zip(columns, row)) for row in rows]
+        error = None
+        try:
+            if hasattr(self.db, "get_conn"):
+                with self.db.get_conn() as conn:
+                    result = conn.set_table(table).insert_many(obj_list)
+            else:
+                result = self.db.set_table(table).insert_many(obj_list)
+            if result is False:
+                error = "insert_many failed"
+        except Exception as e:
+            error = str(e)
+        with self._cond:
+            if error is None:
+                self._counters["rows_written"] += len(rows)
+                self._counters["batches"] += 1
+            else:
+                self._counters["failed_rows"] += len(rows)
+        if error is not None:
+            self._log.error(f"BufferedWriter failed to write {len(rows)} rows into {table} -> {error}")
+            if self.on_error is not None:
+                try:
+                    self.on_error(table, obj_list, error)
+                except Exception as e:
+                    self._log.error(f"BufferedWriter on_error callback failed -> {str(e)}")
+
+    def flush(self):
+        """把缓冲区中的所有数据写入数据库，返回时之前write的数据都已经写入(或者已经回调on_error)"""
+        with self._flush_lock:
+            with self._cond:
+                ready = self._take(force=True)
+            self._write(ready)
+
+    def close(self):
+        """停止后台线程并写入剩余的数据，可以重复调用"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def stats(self):
+        """:return: 已写入行数、批次数、失败行数、背压等待次数，以及当前缓冲的行数"""
+        with self._cond:
+            return {**self._counters, "buffered_rows": self._buffered_rows, "buffers": len(self._buffers)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
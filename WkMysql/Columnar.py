@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 14:10:32
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : Columnar.py
+# @Brief    : 按列存放的查询结果
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+把查询结果按列解码到数组中:
+- 安装了numpy时使用numpy数组，整数列为int64，浮点列为float64
+- 否则整数列/浮点列使用array.array('q')/array.array('d')
+- 其他类型的列，或者包含NULL、超出范围的数值列，退化为object数组(numpy)或列表
+"""
+
+from array import array
+from pymysql.constants import FIELD_TYPE
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+_INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+
+
+def get_typecode(type_code):
+    """:return: 'q'(int64) / 'd'(float64) / None(object)"""
+    if type_code in _INT_TYPES:
+        return "q"
+    if type_code in _FLOAT_TYPES:
+        return "d"
+    return None
+
+
+class ColumnBuffer:
+    """单列的缓冲区，每次追加一批数据"""
+
+    def __init__(self, name, type_code, use_numpy=True):
+        self.name = name
+        self.typecode = get_typecode(type_code)
+        self.use_numpy = use_numpy and np is not None
+        if self.use_numpy:
+            self.chunks = []
+        else:
+            self.data = array(self.typecode) if self.typecode else []
+
+    def extend(self, values: tuple):
+        if self.typecode is not None:
+            try:
+                if self.use_numpy:
+                    self.chunks.append(np.fromiter(values, dtype=self._dtype(), count=len(values)))
+                else:
+                    self.data.extend(array(self.typecode, values))
+                return
+            except (TypeError, ValueError, OverflowError):
+                self._to_object()
+        if self.use_numpy:
+            chunk = np.empty(len(values), dtype=object)
+            chunk[:] = values
+            self.chunks.append(chunk)
+        else:
+            self.data.extend(values)
+
+    def _dtype(self):
+        return np.int64 if self.typecode == "q" else np.float64
+
+    def _to_object(self):
+        """列中出现了NULL或超出范围的值，退化为object"""
+        if self.use_numpy:
+            self.chunks = [chunk.astype(object) for chunk in self.chunks]
+        else:
+            self.data = list(self.data)
+        self.typecode = None
+
+    def build(self):
+        if not self.use_numpy:
+            return self.data
+        if not self.chunks:
+            return np.empty(0, dtype=self._dtype() if self.typecode else object)
+        if len(self.chunks) == 1:
+            return self.chunks[0]
+        return np.concatenate(self.chunks)
+
+
+class ColumnarBuilder:
+    """按照cursor.description为每一列创建缓冲区，逐批追加数据，最后生成 {列名: 数组}"""
+
+    def __init__(self, description, use_numpy=None):
+        use_numpy = np is not None if use_numpy is None else use_numpy
+        self.buffers = [ColumnBuffer(desc[0], desc[1], use_numpy) for desc in description]
+
+    def extend(self, rows: list | tuple):
+        if not rows:
+            return
+        for buffer, values in zip(self.buffers, zip(*rows)):
+            buffer.extend(values)
+
+    def build(self):
+        return {buffer.name: buffer.build() for buffer in self.buffers}
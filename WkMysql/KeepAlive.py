@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 15:02:47
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : KeepAlive.py
+# @Brief    : 进程内共享的连接保活调度器
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+所有WkMysql连接共用一个后台线程保活，而不是每个连接一个线程:
+- 每个连接按 "最后一次使用时间 + time_interval" 计算下一次检查的时间，放入最小堆
+- 到期时如果连接在这段时间内被使用过，只需要把检查时间往后推，不会ping
+- 连接正在执行查询(锁被占用)时直接跳过，保活永远不会阻塞查询
+"""
+
+import heapq
+import itertools
+import time
+import weakref
+from threading import Condition, Thread
+from WkLog import WkLog
+
+
+class KeepAliveScheduler:
+    def __init__(self):
+        self._heap = []  # (deadline, seq, weakref(WkMysql))
+        self._seq = itertools.count()  # deadline相同时保证可以比较
+        self._cond = Condition()
+        self._thread: Thread = None
+        self._log = WkLog()
+
+    def register(self, db):
+        """
+        注册一个连接，db需要提供 time_interval/lock/close_flag/last_use_time 属性以及 _keep_alive() 方法
+        """
+        with self._cond:
+            self._push(time.time() + db.time_interval, db)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="WkMysql-KeepAlive", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _push(self, deadline, db):
+        heapq.heappush(self._heap, (deadline, next(self._seq), weakref.ref(db)))
+
+    def size(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    self._cond.wait(self._heap[0][0] - time.time() if self._heap else None)
+                _, _, ref = heapq.heappop(self._heap)
+            db = ref()
+            if db is None or db.close_flag:  # 连接已经关闭或被回收，不再保活
+                continue
+            next_deadline = self._check(db)
+            with self._cond:
+                self._push(next_deadline, db)
+
+    def _check(self, db):
+        """:return: 下一次检查的时间"""
+        now = time.time()
+        idle_deadline = db.last_use_time + db.time_interval
+        if idle_deadline > now:  # 期间被使用过，连接是活跃的
+            return idle_deadline
+        if not db.lock.acquire(blocking=False):  # 正在执行查询，跳过
+            return now + db.time_interval
+        try:
+            db._keep_alive()
+        except Exception as e:
+            self._log.error(f"Keep alive failed -> {str(e)}")
+        finally:
+            db.lock.release()
+        return time.time() + db.time_interval
+
+
+# 进程内共享的保活调度器
+keepalive_scheduler = KeepAliveScheduler()
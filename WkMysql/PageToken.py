@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 19:12:07
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : PageToken.py
+# @Brief    : 分页游标的序列化
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+把最后一行的key序列化为字符串(URL安全的base64编码的JSON)，可以保存到文件或数据库中，程序重启后从这里继续分页
+JSON不支持的类型按如下方式编码:
+- datetime/date/time/timedelta -> {"$dt": ...}/{"$d": ...}/{"$t": ...}/{"$td": 秒数}
+- Decimal -> {"$dec": "1.23"}
+- bytes -> {"$b": base64}
+"""
+
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"$t": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"$td": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$b": base64.b64encode(bytes(value)).decode("ascii")}
+    return value
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    (tag, data), = value.items()
+    if tag == "$dt":
+        return datetime.datetime.fromisoformat(data)
+    if tag == "$d":
+        return datetime.date.fromisoformat(data)
+    if tag == "$t":
+        return datetime.time.fromisoformat(data)
+    if tag == "$td":
+        return datetime.timedelta(seconds=data)
+    if tag == "$dec":
+        return Decimal(data)
+    if tag == "$b":
+        return base64.b64decode(data)
+    raise ValueError(f"invalid page token value: {value!r}")
+
+
+def encode_token(columns: list, values: list) -> str:
+    """:return: 分页游标，包含排序列名和最后一行的值"""
+    data = {"c": list(columns), "v": [_encode_value(value) for value in values]}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_token(token: str, columns: list) -> list:
+    """
+    :param columns: 当前的排序列，与游标中的不一致时抛出ValueError
+    :return: 最后一行的值
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"invalid page token: {token!r}") from e
+    if data.get("c") != list(columns):
+        raise ValueError(f"page token was created for order_by={data.get('c')}, got {list(columns)}")
+    return [_decode_value(value) for value in data["v"]]
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 16:21:09
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : PoolStats.py
+# @Brief    : 连接池监控指标
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+pool = WkMysqlPool(...)
+print(pool.stats())                  # 字典格式的快照
+print(pool.prometheus_metrics())     # Prometheus文本格式
+pool.start_metrics_server(port=9105) # 本地启动 http://127.0.0.1:9105/metrics
+"""
+
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+# 单位：秒
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最后一个是 +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """:return: {"buckets": {上界: 累计次数}, "sum": 总和, "count": 次数}"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = {}
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative[bound] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+class PoolMetrics:
+    """连接池的计数器和直方图，仪表盘(空闲/使用中/总数)在生成快照时由连接池提供"""
+
+    COUNTERS = ("acquires", "timeouts", "created", "closed", "failed")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.acquire_wait = Histogram(buckets)  # 获取连接的等待时间
+        self.hold_time = Histogram(buckets)  # 连接被借出的时间
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = Lock()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def snapshot(self, gauges: dict):
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **gauges,
+            **counters,
+            "acquire_wait": self.acquire_wait.snapshot(),
+            "hold_time": self.hold_time.snapshot(),
+        }
+
+
+def to_prometheus(snapshot: dict, labels: dict, prefix="wkmysql_pool"):
+    """把stats快照转换为Prometheus文本格式"""
+    label_str = ",".join([f'{k}="{_escape_label(v)}"' for k, v in labels.items()])
+    lines = []
+
+    def sample(name, value, extra=""):
+        all_labels = ",".join([x for x in (label_str, extra) if x])
+        lines.append(f"{name}{{{all_labels}}} {value}")
+
+    for name, help_text in (("idle", "Idle connections"), ("in_use", "Connections checked out or being created"), ("total", "Open connections"), ("waiting", "Threads waiting for a connection"), ("max_conn", "Maximum pool size"), ("min_conn", "Minimum pool size")):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        sample(f"{prefix}_{name}", snapshot[name])
+    for name, help_text in (("acquires", "Successful acquires"), ("timeouts", "Acquire timeouts"), ("created", "Connections created"), ("closed", "Connections closed"), ("failed", "Connection creation failures")):
+        lines.append(f"# HELP {prefix}_{name}_total {help_text}")
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        sample(f"{prefix}_{name}_total", snapshot[name])
+    for name, help_text in (("acquire_wait", "Time spent waiting for a connection"), ("hold_time", "Time a connection was checked out")):
+        hist = snapshot[name]
+        metric = f"{prefix}_{name}_seconds"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, count in hist["buckets"].items():
+            sample(f"{metric}_bucket", count, f'le="{"+Inf" if bound == float("inf") else bound}"')
+        sample(f"{metric}_sum", hist["sum"])
+        sample(f"{metric}_count", hist["count"])
+    return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_metrics_server(render, port=9105, host="127.0.0.1"):
+    """
+    启动一个只提供 /metrics 的HTTP服务(后台线程)
+    :param render: 无参函数，返回Prometheus文本
+    :return: ThreadingHTTPServer，调用shutdown()停止
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name="WkMysqlPool-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 17:40:18
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : ResultCache.py
+# @Brief    : 查询结果缓存
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+cache = ResultCache(max_size=10000, ttl=30)
+db = WkMysql(..., result_cache=cache)
+pool = WkMysqlPool(..., result_cache=cache)  # 连接池中所有连接共用同一个缓存
+db.set_table("users").select_one(id=1)  # 查询数据库
+db.set_table("users").select_one(id=1)  # 命中缓存
+db.set_table("users").update({"id": 1}, {"name": "wk"})  # users表的缓存全部失效
+print(cache.stats())
+"""
+
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+MISS = object()  # 未命中缓存
+
+_READ_SQL = re.compile(r"^\s*(SELECT|SHOW|DESC|DESCRIBE|EXPLAIN|WITH)\b", re.I)
+_WRITE_TABLE = re.compile(
+    r"\b(?:INSERT(?:\s+IGNORE)?(?:\s+INTO)?|REPLACE(?:\s+INTO)?|UPDATE(?:\s+IGNORE)?|DELETE(?:\s+IGNORE)?\s+FROM|"
+    r"TRUNCATE(?:\s+TABLE)?|ALTER\s+TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|INTO\s+TABLE)\s+([`\w.$]+)",
+    re.I,
+)
+_MULTI_TABLE = re.compile(r"\bJOIN\b", re.I)
+_MULTI_STATEMENT = re.compile(r";\s*\S")
+# WITH ... 后面可以跟 UPDATE/DELETE(MySQL 8)，只有不包含写关键字时才算读语句
+_CTE = re.compile(r"^\s*WITH\b", re.I)
+_CTE_WRITE = re.compile(r"\b(?:UPDATE|DELETE|INSERT|REPLACE)\b", re.I)
+# 多表UPDATE/DELETE: UPDATE t1, t2 SET ... / DELETE t1, t2 FROM ... / DELETE FROM t1, t2 USING ...
+_TABLE_LIST = re.compile(r"^\s*(?:UPDATE(?:\s+LOW_PRIORITY)?(?:\s+IGNORE)?|DELETE\b[^;]*?\bFROM|DELETE)\s+[`\w.$]+(?:\s+(?:AS\s+)?\w+)?\s*,", re.I)
+
+
+def normalize_table(table: str) -> str:
+    """去掉反引号和库名，统一小写: `db`.`Users` -> users"""
+    return table.replace("`", "").split(".")[-1].lower()
+
+
+def parse_write_tables(sql: str):
+    """
+    解析SQL语句会修改哪些表
+    :return: 表名集合；读语句返回空集合；无法确定(多表语句、多条语句、无法识别)时返回None
+    """
+    if _MULTI_STATEMENT.search(sql):
+        return None
+    if _READ_SQL.match(sql):
+        return None if _CTE.match(sql) and _CTE_WRITE.search(sql) else set()
+    if _MULTI_TABLE.search(sql) or _TABLE_LIST.match(sql):
+        return None
+    tables = {normalize_table(table) for table in _WRITE_TABLE.findall(sql)}
+    return tables or None
+
+
+class ResultCache:
+    """
+    进程内的查询结果缓存，按 (数据库, SQL, 参数) 缓存原始行数据
+    - 容量超过max_size时淘汰最久未使用的结果，超过ttl秒的结果视为过期
+    - 通过WkMysql对某张表执行写操作后，这张表的所有缓存结果都会失效
+    - 每张表有一个版本号，查询开始后表被修改过，则查询结果不会写入缓存，避免并发时缓存旧数据
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl  # 单位：秒，None表示不过期
+        self._cache: OrderedDict = OrderedDict()  # key -> (过期时间, 表名, 结果)
+        self._tables: dict[str, set] = {}  # 表名 -> 该表的缓存key
+        self._versions: dict[str, int] = {}  # 表名 -> 版本号，每次失效加1
+        self._global_version = 0  # 清空全部缓存时加1
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(database, sql, values):
+        """:return: 缓存key，参数不可哈希时返回None(不缓存)"""
+        try:
+            key = (database, sql, tuple(values) if values is not None else None)
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def version(self, table: str):
+        """查询前获取表的版本号，写入缓存时传给set"""
+        with self._lock:
+            return self._global_version, self._versions.get(normalize_table(table), 0)
+
+    def get(self, key):
+        """:return: 缓存的结果，未命中返回MISS"""
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                self._counters["misses"] += 1
+                return MISS
+            if item[0] is not None and item[0] <= time.monotonic():
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return MISS
+            self._cache.move_to_end(key)
+            self._counters["hits"] += 1
+            return item[2]
+
+    def set(self, table: str, key, value, version):
+        """
+        :param version: 查询前通过version()获取的版本号，期间表被修改过则不写入
+        """
+        table = normalize_table(table)
+        expire_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if version != (self._global_version, self._versions.get(table, 0)):
+                return
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = (expire_at, table, value)
+            self._tables.setdefault(table, set()).add(key)
+            while len(self._cache) > self.max_size:
+                self._remove(next(iter(self._cache)))
+                self._counters["evictions"] += 1
+
+    def _remove(self, key):
+        _, table, _ = self._cache.pop(key)
+        keys = self._tables.get(table)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tables[table]
+
+    def invalidate(self, table: str = None):
+        """使一张表的缓存失效，table为None时清空全部缓存"""
+        with self._lock:
+            self._counters["invalidations"] += 1
+            if table is None:
+                self._global_version += 1
+                self._cache.clear()
+                self._tables.clear()
+                return
+            table = normalize_table(table)
+            self._versions[table] = self._versions.get(table, 0) + 1
+            for key in self._tables.pop(table, ()):
+                del self._cache[key]
+
+    def invalidate_sql(self, sql: str):
+        """根据SQL语句使相关表的缓存失效，无法确定修改了哪些表时清空全部缓存"""
+        tables = parse_write_tables(sql)
+        if tables is None:
+            self.invalidate()
+            return
+        for table in tables:
+            self.invalidate(table)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        """:return: 命中/未命中/淘汰/过期/失效次数、命中率和当前缓存数量"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._cache)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
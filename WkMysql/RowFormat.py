@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 13:05:51
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : RowFormat.py
+# @Brief    : 查询结果的行格式
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+支持的行格式
+- dict: 字典，键为列名(默认)
+- tuple: 数据库驱动返回的原始元组，不做任何转换，开销最小
+- namedtuple: 具名元组，可以用 row.id 或 row[0] 访问
+- record: 使用 __slots__ 的轻量对象，可以用 row.id 访问
+
+namedtuple和record的类按列名缓存，同一组列名只会生成一次
+"""
+
+import keyword
+from collections import namedtuple
+from functools import lru_cache
+
+ROW_FORMATS = ("dict", "tuple", "namedtuple", "record")
+
+
+class Record:
+    """record格式的基类，子类的 __slots__ 即为列名"""
+
+    __slots__ = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join([f'{name}={getattr(self, name)!r}' for name in self.__slots__])})"
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@lru_cache(maxsize=256)
+def get_row_class(row_format: str, column_names: tuple):
+    """
+    生成(并缓存)某一组列名对应的namedtuple或record类
+    - namedtuple: 不合法的字段名(关键字、以下划线开头、重复等)按照namedtuple的规则重命名为 _0, _1 ...
+    - record: 合法的标识符(包括以下划线开头的 _id)保持不变，只有关键字、非标识符、以双下划线开头(会被改名)和重复的列名重命名为 _下标
+    """
+    if row_format == "namedtuple":
+        return namedtuple("Row", column_names, rename=True)
+    fields = []
+    seen = set()
+    for index, name in enumerate(column_names):
+        if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("__") or name in seen:
+            name = f"_{index}"
+            while name in seen or name in column_names:  # 不能与任何一个原始列名冲突，例如列名本身就是 _1
+                name = f"{name}_"
+        seen.add(name)
+        fields.append(name)
+    return type("Record", (Record,), {"__slots__": tuple(fields)})
+
+
+def get_row_factory(row_format: str, column_names: tuple):
+    """
+    :return: 把一行原始元组转换为指定格式的函数
+    """
+    if row_format == "dict":
+        return lambda row: dict(zip(column_names, row))
+    if row_format == "tuple":
+        return tuple
+    if row_format == "namedtuple":
+        return get_row_class(row_format, column_names)._make
+    if row_format == "record":
+        return get_row_class(row_format, column_names)
+    raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 11:20:05
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : SqlTemplateCache.py
+# @Brief    : CRUD语句模板缓存
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+cache = SqlTemplateCache(max_size=1024)
+sql = cache.get("select", "test_table", where={"id": 1, "name": None})
+# SELECT * FROM test_table where `id` = %s AND `name` is %s
+print(cache.stats())
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class SqlTemplateCache:
+    """
+    按 (操作, 表名, 列名, NULL掩码) 缓存已经拼接好的SQL模板，避免每次调用都重新拼接字符串
+    模板中只包含占位符，值仍然通过参数传递，所以同一模板可以被不同的值复用
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, op: str, table: str, where: dict = None, columns: tuple = None) -> str:
+        """
+        获取SQL模板
+        :param op: exists/select/select_one/delete/insert/update
+        :param table: 表名
+        :param where: 查询条件字典，值为None时使用 is %s
+        :param columns: insert的列名或update要更新的列名
+        """
+        key = (op, table, tuple([(k, v is None) for k, v in where.items()]) if where is not None else None, tuple(columns) if columns is not None else None)
+        with self._lock:
+            sql = self._cache.get(key)
+            if sql is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return sql
+            self.misses += 1
+        sql = self._build(op, table, key[2], key[3])
+        with self._lock:
+            self._cache[key] = sql
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return sql
+
+    def _build(self, op, table, where, columns):
+        if op == "exists":
+            return f"SELECT 1 FROM {table} WHERE {self._where(where)} LIMIT 1"
+        if op == "select":
+            return f"SELECT * FROM {table} where {self._where(where)}"
+        if op == "select_one":
+            return f"SELECT * FROM {table} where {self._where(where)} LIMIT 1"
+        if op == "delete":
+            return f"DELETE FROM {table} WHERE {self._where(where)}"
+        if op == "insert":
+            return f"INSERT INTO {table}({self._columns(columns)}) VALUES({', '.join(['%s'] * len(columns))})"
+        if op == "update":
+            set_params = ", ".join([f"`{column_name}` = %s" for column_name in columns])
+            return f"UPDATE {table} set {set_params} where {self._where(where)}"
+        raise ValueError(f"unknown sql template: {op}")
+
+    def _where(self, where):
+        return " AND ".join([f"`{column_name}` {'is' if is_null else '='} %s" for column_name, is_null in where])
+
+    def _columns(self, columns):
+        return ", ".join([f"`{column_name}`" for column_name in columns])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 进程内共享的默认缓存，WkMysql/AsyncWkMysql的所有实例共用
+sql_template_cache = SqlTemplateCache()
@@ -34,16 +34,34 @@ db.set_table(TABLE).create_table(
 
 import atexit
 from contextlib import contextmanager
+import os
+import re
 import pymysql
-from pymysql.cursors import Cursor
+from pymysql.constants import CLIENT
+from pymysql.cursors import Cursor, SSCursor
+import reprlib
 import sys
+import tempfile
 import time
-from threading import Lock, Thread
+from threading import RLock, Thread
 import traceback
-from WkLog import WkLog
+from WkLog import WkLog, DEBUG, ERROR
+from .SqlTemplateCache import SqlTemplateCache, sql_template_cache
+from .RowFormat import ROW_FORMATS, get_row_factory
+from .Columnar import ColumnarBuilder
+from .KeepAlive import keepalive_scheduler
+from .ResultCache import MISS, ResultCache
+from .PageToken import decode_token, encode_token
+
+# 多行INSERT返回的信息，例如 "Records: 3  Duplicates: 1  Warnings: 0"
+_INSERT_INFO = re.compile(r"Records:\s*(\d+)\s+Duplicates:\s*(\d+)")
+# LOAD DATA 默认格式(FIELDS ESCAPED BY '\\')下需要转义的字符
+_INFILE_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
 
 
 class WkMysql:
+    sql_cache: SqlTemplateCache = sql_template_cache  # SQL模板缓存，默认所有实例共用
+
     def __init__(
         self,
         host,
@@ -51,7 +69,12 @@ class WkMysql:
         password,
         database,
         port=3306,
-        time_interval=60,  # 设置每隔多长时间进行一次连接测试，单位秒，目的是保持连接不断开
+        time_interval=60,  # 连接空闲超过该时间(秒)时进行一次连接测试，目的是保持连接不断开
+        log_level=None,  # 日志等级，例如 "INFO"，None表示使用WkLog的默认配置
+        quiet=False,  # 安静模式：不输出每次操作成功的日志，失败日志照常输出
+        log_max_values=10,  # 日志中最多输出多少个参数值，超出部分用...代替
+        row_format="dict",  # 查询结果的行格式: dict/tuple/namedtuple/record，查询时也可以单独指定
+        result_cache: ResultCache = None,  # 查询结果缓存，None表示不缓存；多个连接可以共用同一个缓存
         **kwargs,
     ):
         self.host = host
@@ -63,17 +86,30 @@ class WkMysql:
         self.kwargs = kwargs
 
         self.table: str = None
+        self.row_format: str = self.__check_row_format(row_format)
+        self.result_cache: ResultCache = result_cache
         self.time_interval = time_interval
         self.last_connect_time = None  # 上次连接时间
+        self.last_use_time = time.time()  # 上次使用时间，保活调度器据此判断连接是否空闲
         self.close_flag: bool = False
+        self.max_allowed_packet: int = None  # 服务器的max_allowed_packet，第一次批量写入时查询
 
+        self.quiet: bool = quiet
         self._log = WkLog()
-        self.lock = Lock()
+        if log_level is not None:
+            self._log.set_level(log_level)
+        self._repr = reprlib.Repr()
+        self._repr.maxlist = self._repr.maxtuple = self._repr.maxdict = log_max_values
+        self._repr.maxstring = self._repr.maxother = 100
+        self.lock = RLock()  # 可重入，事务范围内同一线程可以连续调用多个方法
+        self._in_transaction: bool = False
+        self._pending_invalidations: list = []  # 事务中推迟到事务结束时再失效的缓存
 
         self.conn: pymysql.Connection = self.connect_db()
         atexit.register(self.close)
 
-        self.new_thread(self.keep_connect, self.time_interval)
+        # 所有连接共用一个保活线程
+        keepalive_scheduler.register(self)
 
     def connect_db(self) -> pymysql.Connection:
         try:
@@ -88,6 +124,7 @@ class WkMysql:
             )
             self._log.debug("Successfully connected to database!")
             self.last_connect_time = time.time()
+            self.max_allowed_packet = None
             return conn
         except Exception as e:
             msg = f"Failed to connect to database! -> {str(e)}"
@@ -105,6 +142,22 @@ class WkMysql:
             except Exception as e:
                 self._log.error(f"Failed to close database connection! -> {str(e)}")
 
+    def ping(self):
+        """
+        使用协议层的COM_PING检测连接是否可用，不会重新连接，连接正在使用时会等待
+        :return: True/False
+        """
+        with self.lock:
+            if self.close_flag:
+                return False
+            try:
+                self.conn.ping(reconnect=False)
+                self.last_use_time = time.time()
+                return True
+            except Exception as e:
+                self._log.debug(f"Ping failed -> {str(e)}")
+                return False
+
     def before_execute(func):
         def wrapper(self, *args, **kwargs):
             if self.table is None:
@@ -116,46 +169,111 @@ class WkMysql:
 
         return wrapper
 
+    def invalidate_cache(func):
+        """写操作执行后，使当前表的查询结果缓存失效"""
+
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                if self.table is not None:
+                    self.__invalidate(table=self.table)
+
+        return wrapper
+
+    def __invalidate(self, table=None, sql=None):
+        """使查询结果缓存失效，事务中推迟到事务结束时执行，避免其他连接在提交前重新缓存旧数据"""
+        if self.result_cache is None:
+            return
+        if self._in_transaction:
+            self._pending_invalidations.append((table, sql))
+        elif sql is not None:
+            self.result_cache.invalidate_sql(sql)
+        else:
+            self.result_cache.invalidate(table)
+
+    def __commit(self):
+        """连接默认开启autocommit，每条语句已经自动提交，不再发送多余的COMMIT；事务中推迟到事务结束时统一提交"""
+        if self._in_transaction or self.conn.get_autocommit():
+            return
+        self.conn.commit()
+
+    def __rollback(self):
+        """autocommit模式下没有需要回滚的内容；事务中由transaction()统一回滚"""
+        if self._in_transaction or self.conn.get_autocommit():
+            return
+        self.conn.rollback()
+
+    @contextmanager
+    def transaction(self):
+        """
+        事务范围：范围内的所有操作在同一个事务中执行，正常退出时只提交一次，出现异常时回滚并抛出异常
+        - 范围内的方法出错时不再返回-1/False/None，而是直接抛出异常
+        - 范围内持有连接锁，其他线程使用同一个实例时会等待事务结束
+        - 嵌套调用时并入外层事务
+        - 注意: CREATE/DROP TABLE等DDL语句会导致MySQL隐式提交
+        - demo:
+            - with db.transaction():
+                  db.set_table("account").update({"id": 1}, {"balance": 90})
+                  db.set_table("account").update({"id": 2}, {"balance": 110})
+        """
+        with self.lock:
+            if self._in_transaction:
+                yield self
+                return
+            self.__test_conn()
+            self.conn.begin()
+            self._in_transaction = True
+            try:
+                yield self
+                self.conn.commit()
+                self._log.debug("Transaction committed!")
+            except BaseException:
+                try:
+                    self.conn.rollback()
+                    self._log.debug("Transaction rolled back!")
+                except Exception as e:
+                    self._log.error(f"Failed to rollback transaction! -> {str(e)}")
+                raise
+            finally:
+                self._in_transaction = False
+                pending, self._pending_invalidations = self._pending_invalidations, []
+                for table, sql in pending:
+                    self.__invalidate(table, sql)
+
     def new_thread(self, func, *args):
         # print(args)
         t = Thread(target=func, args=args)
         t.daemon = True
         t.start()
 
-    def keep_connect(self, time_interval):
-        self._log.debug(f"Keep connect to database every {time_interval} seconds!")
-        while True:
-            time.sleep(time_interval)
-            with self.lock:
-                self._log.debug("Keep connect to database!")
-                self.__test_conn()
+    def _keep_alive(self):
+        """
+        由保活调度器(KeepAliveScheduler)调用，调用时已经持有self.lock，并且连接空闲超过了time_interval
+        """
+        self._log.debug("Keep connect to database!")
+        self.__test_conn()
 
     def __test_conn(self):
         """
         长连接时，如果长时间不进行数据库交互，连接就会关闭，再次请求就会报错
-        每次使用游标的时候，都调用下这个方法
+        每次使用游标的时候，都调用下这个方法：连接空闲超过time_interval时发送一次ping(COM_PING，不执行查询)
         """
         try:
             if self.close_flag:
                 return
             current_time = time.time()
-            if current_time - self.last_connect_time >= self.time_interval:
+            if current_time - self.last_use_time >= self.time_interval:
                 self._log.debug("__test_conn")
-                with self.get_cursor() as cursor:
-                    cursor.execute("SELECT 1")
+                self.conn.ping(reconnect=False)
                 self.last_connect_time = current_time
+            self.last_use_time = current_time
         except:
             print(traceback.format_exc())
+            if self._in_transaction:  # 重新连接会丢失事务
+                raise
             self.conn = self.connect_db()
-
-    def __get_query_params(self, obj: dict | list):
-        if isinstance(obj, dict):
-            return " AND ".join([f"`{column_name}` {'=' if obj[column_name] is not None else 'is'} %s" for column_name in obj.keys()])
-        elif isinstance(obj, list):
-            return " AND ".join([f"`{column_name}` {'=' if column_name is not None else 'is'} %s" for column_name in obj])
-
-    def __get_set_params(self, obj: dict):
-        return ", ".join([f"`{column_name}` {'=' if obj[column_name] is not None else 'is'} %s" for column_name in obj.keys()])
+            self.last_use_time = time.time()
 
     def __get_col_params(self, obj: dict | list):
         if isinstance(obj, dict):
@@ -172,8 +290,43 @@ class WkMysql:
                 res.append(self.__get_values(o))
             return res
 
-    def __get_placeholders(self, length):
-        return ", ".join(["%s"] * length)
+    def __get_packet_limit(self):
+        """
+        单条SQL语句允许的最大字节数: 取服务器和客户端max_allowed_packet中较小的值，并预留包头等空间
+        """
+        if self.max_allowed_packet is None:
+            with self.get_cursor() as cursor:
+                cursor.execute("SELECT @@max_allowed_packet")
+                self.max_allowed_packet = int(cursor.fetchone()[0])
+        return min(self.max_allowed_packet, self.conn.max_allowed_packet) - 1024
+
+    def __literal_row(self, row: list | tuple):
+        return "(" + ", ".join([self.conn.literal(v) for v in row]) + ")"
+
+    def __iter_chunks(self, prefix: str, literals, suffix="", max_bytes=None, max_rows=None):
+        """
+        把多行已转义的VALUES拼接成多条SQL语句，每条语句不超过max_bytes字节
+        :param literals: 可迭代对象，元素为已转义的单行，例如 "(1, 'a')"
+        :param max_rows: 可选，每条语句最多包含多少行
+        :return: 生成器，元素为 (sql, 行数, 字节数)
+        """
+        encoding = self.conn.encoding
+        max_bytes = max_bytes or self.__get_packet_limit()
+        fixed_size = len(prefix.encode(encoding)) + len(suffix.encode(encoding))
+        chunk = []
+        size = fixed_size
+        for literal in literals:
+            literal_size = len(literal.encode(encoding)) + 2  # 2: 分隔符 ", "
+            if chunk and (size + literal_size > max_bytes or len(chunk) == max_rows):
+                yield prefix + ", ".join(chunk) + suffix, len(chunk), size
+                chunk = []
+                size = fixed_size
+            if fixed_size + literal_size > max_bytes:
+                raise Exception(f"single row is larger than max_allowed_packet({max_bytes} bytes)!")
+            chunk.append(literal)
+            size += literal_size
+        if chunk:
+            yield prefix + ", ".join(chunk) + suffix, len(chunk), size
 
     def __validate_args(self, args, kwargs):
         """
@@ -187,20 +340,25 @@ class WkMysql:
             if len(args) > 1 or not isinstance(args[0], dict):
                 raise Exception("args's length must be 1 and the type must be dict!")
 
-    def __package_data(self, data: list | tuple | None, cursor: Cursor):
-        """用来封装数据: 把数据封装为json数据"""
-        json_data = []
+    def __check_row_format(self, row_format):
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
+        return row_format
+
+    def __package_data(self, data: list | tuple | None, column_names: tuple, row_format=None):
+        """用来封装数据: 按照row_format把数据封装为字典/元组/具名元组/record对象"""
+        row_format = self.__check_row_format(row_format or self.row_format)
         try:
             if data is None:
                 return None
+            if row_format == "tuple":  # 不做任何转换
+                return data
 
-            column_names = [desc[0] for desc in cursor.description]  # 获取列名
+            factory = get_row_factory(row_format, column_names)
             if type(data) == list:
-                for d in data:
-                    json_data.append(dict(zip(column_names, d)))
-                return json_data
+                return [factory(d) for d in data]
             elif type(data) == tuple:
-                return dict(zip(column_names, data))
+                return factory(data)
             else:
                 raise TypeError("data类型错误，应为列表或元组")
         except Exception as e:
@@ -208,10 +366,42 @@ class WkMysql:
             return None
 
     def __print_info(self, func_name, sql=None, values=None, success=True, error_msg=None, cursor: Cursor = None):
+        """
+        日志只有在对应等级开启时才会拼接，参数值会被截断，避免批量操作时把所有数据都转成字符串
+        """
         if success:
-            self._log.debug(f"Success: {func_name} -> {sql} -> {values} -> Rows affected: {cursor.rowcount}")
+            if self.quiet or self._log.level > DEBUG:
+                return
+            self._log.debug(f"Success: {func_name} -> {sql} -> {self._repr.repr(values)} -> Rows affected: {cursor.rowcount}")
         else:
-            self._log.error(f"Failure: {func_name} -> {sql} -> {values} -> {error_msg}")
+            if self._log.level > ERROR:
+                return
+            self._log.error(f"Failure: {func_name} -> {sql} -> {self._repr.repr(values)} -> {error_msg}")
+
+    def __query(self, func_name, sql, values=None, one=False, use_cache=True):
+        """
+        执行查询，返回 (数据, 列名)
+        开启了结果缓存时先查缓存，未命中时查询数据库并写入缓存；缓存的是驱动返回的原始元组，每次命中都会重新封装
+        :param use_cache: False时不读也不写缓存，用于遍历全表等只会读一次的查询，避免挤掉热点数据
+        """
+        cache = self.result_cache if use_cache else None
+        # 事务中可能读到未提交的数据，不使用缓存
+        key = cache.make_key(self.database, sql, values) if cache is not None and not self._in_transaction else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not MISS:
+                if not self.quiet and self._log.level <= DEBUG:
+                    self._log.debug(f"Cache hit: {func_name} -> {sql} -> {self._repr.repr(values)}")
+                return cached
+            version = cache.version(self.table)
+        with self.get_cursor() as cursor:
+            cursor.execute(sql, values)
+            data = cursor.fetchone() if one else cursor.fetchall()
+            self.__print_info(func_name, sql=sql, values=values, cursor=cursor)
+            result = (data, tuple([desc[0] for desc in cursor.description]))
+        if key is not None:
+            cache.set(self.table, key, result, version)
+        return result
 
     def set_table(self, table):
         self.table = table
@@ -223,7 +413,7 @@ class WkMysql:
             cursor = self.conn.cursor()
             yield cursor
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             raise e
         finally:
             cursor.close()
@@ -239,9 +429,9 @@ class WkMysql:
             self.delete_table()
         return self.__create_table(obj)
 
+    @invalidate_cache
     @before_execute
     def __create_table(self, obj: dict):
-        self.__get_set_params(obj)
         col_params = ", ".join([f"`{column_name}` {column_type}" for column_name, column_type in obj.items()])
         sql = f"CREATE TABLE IF NOT EXISTS {self.table} ({col_params})"
         try:
@@ -251,8 +441,11 @@ class WkMysql:
                 return True
         except Exception as e:
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return False
 
+    @invalidate_cache
     @before_execute
     def delete_table(self):
         """
@@ -267,6 +460,8 @@ class WkMysql:
                 return True
         except Exception as e:
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return False
 
     @before_execute
@@ -283,6 +478,8 @@ class WkMysql:
             return res
         except pymysql.Error as e:
             self.__print_info(sys._getframe().f_code.co_name, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return []
 
     @before_execute
@@ -297,18 +494,17 @@ class WkMysql:
         obj = args[0] if args else kwargs
 
         values = self.__get_values(obj)
-        params = self.__get_query_params(obj)
-        sql = f"SELECT 1 FROM {self.table} WHERE {params} LIMIT 1"
+        sql = self.sql_cache.get("exists", self.table, where=obj)
         try:
-            with self.get_cursor() as cursor:
-                cursor.execute(sql, values)
-                flag = cursor.fetchone() != None
-                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
-                return flag
+            data, _ = self.__query(sys._getframe().f_code.co_name, sql, values, one=True)
+            return data != None
         except Exception as e:
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return False
 
+    @invalidate_cache
     @before_execute
     def insert_row(self, *args, **kwargs):
         """
@@ -322,18 +518,18 @@ class WkMysql:
         obj = args[0] if args else kwargs
 
         values = self.__get_values(obj)
-        col_params = self.__get_col_params(obj)
-        placeholders = self.__get_placeholders(len(obj))
-        sql = f"INSERT INTO {self.table}({col_params}) VALUES({placeholders})"
+        sql = self.sql_cache.get("insert", self.table, columns=obj.keys())
         try:
             with self.get_cursor() as cursor:
                 cursor.execute(sql, values)
-                self.conn.commit()
+                self.__commit()
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount, cursor.lastrowid  # 获取插入数据的自增ID,如果没有自增ID，则返回0
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
 
     def insert_rows(self, obj_list: list[dict]):
@@ -354,6 +550,7 @@ class WkMysql:
                 fail += 1
         return {"success": success, "fail": fail}
 
+    @invalidate_cache
     @before_execute
     def insert_many(self, obj_list: list[dict]):
         """
@@ -365,20 +562,237 @@ class WkMysql:
             self._log.warn("要插入的数据为空!")
             return
         values = self.__get_values(obj_list)
-        col_params = self.__get_col_params(obj_list[0])
-        placeholders = self.__get_placeholders(len(obj_list[0].keys()))
-        sql = f"INSERT INTO {self.table}({col_params}) VALUES({placeholders})"
+        sql = self.sql_cache.get("insert", self.table, columns=obj_list[0].keys())
         try:
             with self.get_cursor() as cursor:
                 cursor.executemany(sql, values)
-                self.conn.commit()
+                self.__commit()
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return False
 
+    @invalidate_cache
+    @before_execute
+    def insert_bulk(self, obj_list: list[dict], max_bytes=None):
+        """
+        批量插入数据: 把多行拼接为 INSERT ... VALUES (...), (...) 语句，并按max_allowed_packet切分
+        每一块单独提交，某一块失败不影响其他块
+        :param obj_list: 列表(或任意可迭代对象)，元素为字典对象，所有字典的键必须与第一个字典相同
+        :param max_bytes: 单条语句最大字节数，默认根据服务器的max_allowed_packet计算
+        :return: 列表，每一块对应一个字典: {"rows": 行数, "bytes": 字节数, "rowcount": 影响行数, "success": True/False, "error": 错误信息}
+        """
+        rows = iter(obj_list)
+        first = next(rows, None)
+        if first is None:
+            self._log.warn("要插入的数据为空!")
+            return []
+        columns = list(first.keys())
+        col_params = self.__get_col_params(columns)
+        prefix = f"INSERT INTO {self.table}({col_params}) VALUES "
+
+        def literals():
+            yield self.__literal_row(list(first.values()))
+            for obj in rows:
+                yield self.__literal_row([obj[column] for column in columns])
+
+        results = []
+        for sql, row_num, size in self.__iter_chunks(prefix, literals(), max_bytes=max_bytes):
+            try:
+                with self.get_cursor() as cursor:
+                    cursor.execute(sql)
+                    self.__commit()
+                    self.__print_info(sys._getframe().f_code.co_name, sql=prefix, values=f"{row_num} rows, {size} bytes", cursor=cursor)
+                    results.append({"rows": row_num, "bytes": size, "rowcount": cursor.rowcount, "success": True, "error": None})
+            except Exception as e:
+                self.__rollback()
+                self.__print_info(sys._getframe().f_code.co_name, sql=prefix, values=f"{row_num} rows, {size} bytes", success=False, error_msg=str(e))
+                if self._in_transaction:
+                    raise
+                results.append({"rows": row_num, "bytes": size, "rowcount": 0, "success": False, "error": str(e)})
+        return results
+
+    @invalidate_cache
+    @before_execute
+    def upsert_many(self, obj_list: list[dict], update_columns: list = None, ignore=False, max_bytes=None):
+        """
+        批量插入或更新: 拼接为多行 INSERT ... ON DUPLICATE KEY UPDATE 语句，并按max_allowed_packet切分，每一块单独提交
+        :param obj_list: 列表(或任意可迭代对象)，元素为字典对象，所有字典的键必须与第一个字典相同
+        :param update_columns: 主键/唯一键冲突时要更新的列，默认更新所有列
+        :param ignore: 为True时使用 INSERT IGNORE，冲突的行直接跳过，不更新
+        :param max_bytes: 单条语句最大字节数，默认根据服务器的max_allowed_packet计算
+        :return: 字典对象 {"inserted": 新插入行数, "updated": 更新行数, "unchanged": 冲突但值没有变化的行数,
+                 "ignored": ignore=True时跳过的行数, "failed": 失败行数, "errors": 错误信息列表}
+        - demo:
+            - upsert_many([{"id": 1, "name": "wk"}, {"id": 2, "name": "wk2"}])
+            - upsert_many(rows, update_columns=["name"])
+            - upsert_many(rows, ignore=True)
+        """
+        res = {"inserted": 0, "updated": 0, "unchanged": 0, "ignored": 0, "failed": 0, "errors": []}
+        rows = iter(obj_list)
+        first = next(rows, None)
+        if first is None:
+            self._log.warn("要插入的数据为空!")
+            return res
+        columns = list(first.keys())
+        col_params = self.__get_col_params(columns)
+        if ignore:
+            prefix = f"INSERT IGNORE INTO {self.table}({col_params}) VALUES "
+            suffix = ""
+        else:
+            # VALUES(col) 兼容MySQL 5.x和8.0(8.0.20起不推荐使用，但仍然支持)
+            update_params = ", ".join([f"`{column}` = VALUES(`{column}`)" for column in update_columns or columns])
+            prefix = f"INSERT INTO {self.table}({col_params}) VALUES "
+            suffix = f" ON DUPLICATE KEY UPDATE {update_params}"
+
+        def literals():
+            yield self.__literal_row(list(first.values()))
+            for obj in rows:
+                yield self.__literal_row([obj[column] for column in columns])
+
+        for sql, row_num, size in self.__iter_chunks(prefix, literals(), suffix, max_bytes):
+            try:
+                with self.get_cursor() as cursor:
+                    cursor.execute(sql)
+                    self.__commit()
+                    self.__print_info(sys._getframe().f_code.co_name, sql=prefix + "..." + suffix, values=f"{row_num} rows, {size} bytes", cursor=cursor)
+                    self.__count_upsert(res, cursor, row_num, ignore)
+            except Exception as e:
+                self.__rollback()
+                self.__print_info(sys._getframe().f_code.co_name, sql=prefix + "..." + suffix, values=f"{row_num} rows, {size} bytes", success=False, error_msg=str(e))
+                if self._in_transaction:
+                    raise
+                res["failed"] += row_num
+                res["errors"].append(str(e))
+        return res
+
+    def __count_upsert(self, res: dict, cursor: Cursor, row_num: int, ignore: bool):
+        """
+        根据影响行数和服务器返回的 "Records: N  Duplicates: D" 计算插入/更新的行数
+        ON DUPLICATE KEY UPDATE 的影响行数: 插入的行计1，更新的行计2，值没有变化的行计0(设置了CLIENT.FOUND_ROWS时计1)
+        - 没有设置CLIENT.FOUND_ROWS(pymysql默认): Duplicates只统计实际被修改的行
+            例如5行中2行新插入、1行被修改、2行冲突但值没有变化: affected = 2 + 2*1 + 0 = 4, Duplicates = 1
+            => updated = 1, inserted = 4 - 2*1 = 2, unchanged = 5 - 2 - 1 = 2
+        - 设置了CLIENT.FOUND_ROWS: Duplicates统计所有冲突的行
+            同样的例子: affected = 2 + 2*1 + 1*2 = 6, Duplicates = 3
+            => inserted = 5 - 3 = 2, updated = 6 - 2 - 3 = 1, unchanged = 3 - 1 = 2
+        - 服务器只对多行INSERT返回Records/Duplicates信息，单行语句(包括切分后最后只剩一行的块)只能根据影响行数判断:
+            - 没有设置CLIENT.FOUND_ROWS: 1插入 / 2更新 / 0没有变化，可以准确区分
+            - 设置了CLIENT.FOUND_ROWS: 插入和没有变化都计1，无法区分，统一按插入统计
+        """
+        affected = cursor.rowcount
+        message = cursor._result.message if cursor._result is not None else None
+        if isinstance(message, bytes):
+            message = message.decode(self.conn.encoding)
+        match = _INSERT_INFO.search(message or "")
+        found_rows = self.conn.client_flag & CLIENT.FOUND_ROWS
+        if match:
+            duplicates = int(match.group(2))
+        elif ignore:  # 单行INSERT没有返回信息
+            duplicates = row_num - affected
+        elif found_rows:
+            duplicates = 0 if affected == 1 else row_num
+        else:
+            duplicates = 1 if affected == 2 else 0  # 单行: 1插入 / 2更新 / 0没有变化
+        if ignore:
+            res["inserted"] += affected
+            res["ignored"] += duplicates
+            return
+        if found_rows:
+            inserted = row_num - duplicates
+            updated = affected - inserted - duplicates
+            unchanged = duplicates - updated
+        else:
+            updated = duplicates
+            inserted = affected - 2 * duplicates
+            unchanged = row_num - inserted - updated
+        res["inserted"] += inserted
+        res["updated"] += updated
+        res["unchanged"] += unchanged
+
+    def __write_infile(self, rows, columns, f):
+        """
+        把数据写成LOAD DATA默认的制表符分隔格式: NULL写为\\N，特殊字符用反斜杠转义
+        :return: 列名列表(如果没有传入columns且数据为字典，则取第一行的键)
+        """
+        encoding = self.conn.encoding
+        for row in rows:
+            if isinstance(row, dict):
+                if columns is None:
+                    columns = list(row.keys())
+                row = [row[column] for column in columns]
+            fields = []
+            for value in row:
+                if value is None:
+                    fields.append("\\N")
+                elif isinstance(value, bool):
+                    fields.append("1" if value else "0")
+                elif isinstance(value, (bytes, bytearray)):
+                    fields.append(bytes(value).decode(encoding, errors="surrogateescape").translate(_INFILE_ESCAPE))
+                else:
+                    fields.append(str(value).translate(_INFILE_ESCAPE))
+            f.write(("\t".join(fields) + "\n").encode(encoding, errors="surrogateescape"))
+        return columns
+
+    @invalidate_cache
+    @before_execute
+    def load_rows(self, rows, columns: list = None):
+        """
+        使用 LOAD DATA LOCAL INFILE 导入数据，是最快的写入方式，需要在连接参数中设置 local_infile=True
+        :param rows: 文件路径，或可迭代对象(元素为字典或列表/元组)
+            - 文件路径: 文件必须是LOAD DATA默认格式，即制表符分隔、换行结尾、反斜杠转义、NULL写为\\N
+            - 可迭代对象: 先流式写入临时文件再导入，导入结束后删除临时文件
+        :param columns: 列名列表，与每行数据的顺序对应，数据为字典时可以省略
+        :return: 字典对象 {"rows": 导入行数, "message": 服务器返回的信息, "warnings": 警告列表} / False
+        - demo:
+            - db.load_rows([{"id": 1, "name": "wangkang"}, {"id": 2, "name": None}])
+            - db.load_rows([(1, "wangkang"), (2, None)], columns=["id", "name"])
+            - db.load_rows("/tmp/data.tsv", columns=["id", "name"])
+        """
+        if not self.kwargs.get("local_infile"):
+            raise Exception("load_rows requires local_infile=True when creating WkMysql!")
+        tmp_path = None
+        try:
+            if isinstance(rows, (str, os.PathLike)):
+                path = os.fspath(rows)
+            else:
+                with tempfile.NamedTemporaryFile("wb", suffix=".tsv", delete=False) as f:
+                    tmp_path = path = f.name
+                    columns = self.__write_infile(rows, columns, f)
+            col_params = f" ({self.__get_col_params(columns)})" if columns else ""
+            sql = (
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} CHARACTER SET {self.conn.charset} "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'{col_params}"
+            )
+            with self.get_cursor() as cursor:
+                cursor.execute(sql, (path,))
+                self.__commit()
+                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=path, cursor=cursor)
+                message = cursor._result.message if cursor._result is not None else None
+                res = {
+                    "rows": cursor.rowcount,
+                    "message": message.decode(self.conn.encoding) if isinstance(message, bytes) else message,
+                    "warnings": [],
+                }
+                if cursor.warning_count:
+                    cursor.execute("SHOW WARNINGS")
+                    res["warnings"] = [{"level": w[0], "code": w[1], "message": w[2]} for w in cursor.fetchall()]
+                return res
+        except Exception as e:
+            self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=f"LOAD DATA LOCAL INFILE -> {self.table}", values=columns, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return False
+        finally:
+            if tmp_path is not None:
+                os.remove(tmp_path)
+
+    @invalidate_cache
     @before_execute
     def delete_row(self, *args, **kwargs):
         """
@@ -391,17 +805,18 @@ class WkMysql:
         obj = args[0] if args else kwargs
 
         values = self.__get_values(obj)
-        params = self.__get_query_params(obj)
-        sql = f"DELETE FROM {self.table} WHERE {params}"
+        sql = self.sql_cache.get("delete", self.table, where=obj)
         try:
             with self.get_cursor() as cursor:
                 cursor.execute(sql, values)
-                self.conn.commit()
+                self.__commit()
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
 
     def delete_rows(self, obj_list: list):
@@ -420,6 +835,79 @@ class WkMysql:
                 fail += 1
         return {"success": success, "fail": fail}
 
+    def __in_clause(self, column: str | list | tuple, keys):
+        """
+        :return: (条件前缀, 已转义的key生成器)
+            - 单列: `id` IN (1, 2, 3)
+            - 多列: (`a`, `b`) IN ((1, 'x'), (2, 'y'))
+        重复的key只保留一个
+        """
+        if isinstance(column, str):
+            prefix = f"`{column}` IN ("
+            literals = (self.conn.literal(key) for key in dict.fromkeys(keys))
+        else:
+            prefix = f"({self.__get_col_params(list(column))}) IN ("
+            literals = (self.__literal_row(key) for key in dict.fromkeys([tuple(key) for key in keys]))
+        return prefix, literals
+
+    @before_execute
+    def select_in(self, column: str | list | tuple, keys, row_format=None, batch_size=1000, max_bytes=None):
+        """
+        根据一批key查询数据，key被切分为多条 WHERE col IN (...) 语句，每条语句最多batch_size个key，并且不超过max_allowed_packet
+        :param column: 列名；传入列名列表时为复合key，keys的元素为对应的元组
+        :param keys: 可迭代对象
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 列表，元素默认为字典对象，结果的顺序与keys无关
+        - demo:
+            - select_in("id", [1, 2, 3])
+            - select_in(["user_id", "order_id"], [(1, 10), (1, 11), (2, 10)])
+        """
+        prefix, literals = self.__in_clause(column, keys)
+        prefix = f"SELECT * FROM {self.table} WHERE {prefix}"
+        sql = prefix
+        res = []
+        try:
+            for sql, _, _ in self.__iter_chunks(prefix, literals, ")", max_bytes, batch_size):
+                data, column_names = self.__query(sys._getframe().f_code.co_name, sql)
+                res.extend(self.__package_data(list(data), column_names, row_format))
+            return res
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return None
+
+    @invalidate_cache
+    @before_execute
+    def delete_in(self, column: str | list | tuple, keys, batch_size=1000, max_bytes=None):
+        """
+        根据一批key删除数据，key被切分为多条 DELETE ... WHERE col IN (...) 语句，参数与select_in相同
+        每条语句单独提交，出错时已经执行的语句不会回滚；需要原子性时在 transaction() 中调用
+        :return: 删除的总行数，出错时返回-1
+        - demo:
+            - delete_in("id", range(500000))
+            - delete_in(["user_id", "order_id"], [(1, 10), (2, 10)])
+        """
+        prefix, literals = self.__in_clause(column, keys)
+        prefix = f"DELETE FROM {self.table} WHERE {prefix}"
+        sql = prefix
+        rowcount = 0
+        try:
+            for sql, row_num, size in self.__iter_chunks(prefix, literals, ")", max_bytes, batch_size):
+                with self.get_cursor() as cursor:
+                    cursor.execute(sql)
+                    self.__commit()
+                    rowcount += cursor.rowcount
+                    self.__print_info(sys._getframe().f_code.co_name, sql=prefix, values=f"{row_num} keys, {size} bytes", cursor=cursor)
+            return rowcount
+        except Exception as e:
+            self.__rollback()
+            self.__print_info(sys._getframe().f_code.co_name, sql=sql[:200], success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    @invalidate_cache
     @before_execute
     def delete_many(self, obj_list: list[dict]):
         """
@@ -431,43 +919,44 @@ class WkMysql:
             self._log.warn("要删除的数据为空!")
             return
         values = self.__get_values(obj_list)
-        params = self.__get_query_params(obj_list[0])
-        # print(params)
-        sql = f"DELETE FROM {self.table} WHERE {params}"
+        sql = self.sql_cache.get("delete", self.table, where=obj_list[0])
         try:
             with self.get_cursor() as cursor:
                 cursor.executemany(sql, values)
-                self.conn.commit()
+                self.__commit()
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
 
     @before_execute
-    def select_all(self):
+    def select_all(self, row_format=None):
         """
         查询所有数据
-        :return: 列表，元素为字典对象，键为列名，值为列值
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 列表，元素默认为字典对象，键为列名，值为列值
         """
         sql = f"SELECT * FROM {self.table}"
         try:
-            with self.get_cursor() as cursor:
-                cursor.execute(sql)
-                data = cursor.fetchall()
-                self.__print_info(sys._getframe().f_code.co_name, sql=sql, cursor=cursor)
-                return self.__package_data(list(data), cursor)
+            data, column_names = self.__query(sys._getframe().f_code.co_name, sql)
+            return self.__package_data(list(data), column_names, row_format)
         except Exception as e:
             print(traceback.format_exc())
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return None
 
     @before_execute
-    def select(self, *args, **kwargs):
+    def select(self, *args, row_format=None, **kwargs):
         """
         根据条件进行查询
-        :return: 列表，元素为字典对象，键为列名，值为列值
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 列表，元素默认为字典对象，键为列名，值为列值
         - demo:
             - select({"id": 1, "name": "wangkang"})
             - select(id=1, name=wangkang)
@@ -476,24 +965,22 @@ class WkMysql:
         obj = args[0] if args else kwargs
 
         values = self.__get_values(obj)
-        param = self.__get_query_params(obj)
-        # print(f"|{col_names}|{col_params}|{values}|{param}|")
-        sql = f"SELECT * FROM {self.table} where {param}"
+        sql = self.sql_cache.get("select", self.table, where=obj)
         try:
-            with self.get_cursor() as cursor:
-                cursor.execute(sql, values)
-                data = cursor.fetchall()
-                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
-                return self.__package_data(list(data), cursor)
+            data, column_names = self.__query(sys._getframe().f_code.co_name, sql, values)
+            return self.__package_data(list(data), column_names, row_format)
         except Exception as e:
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return None
 
     @before_execute
-    def select_one(self, *args, **kwargs):
+    def select_one(self, *args, row_format=None, **kwargs):
         """
         根据条件进行查询，只返回第一条数据
-        :return: 字典对象，键为列名，值为列值
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :return: 默认为字典对象，键为列名，值为列值
         - demo:
             - select_one({"id": 1, "name": "wangkang"})
             - select_one(id=1, name=wangkang)
@@ -502,18 +989,212 @@ class WkMysql:
         obj = args[0] if args else kwargs
 
         values = self.__get_values(obj)
-        param = self.__get_query_params(obj)
-        sql = f"SELECT * FROM {self.table} where {param} LIMIT 1"
+        sql = self.sql_cache.get("select_one", self.table, where=obj)
         try:
-            with self.get_cursor() as cursor:
-                cursor.execute(sql, values)
-                data = cursor.fetchone()
-                self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
-                return self.__package_data(data, cursor)
+            data, column_names = self.__query(sys._getframe().f_code.co_name, sql, values, one=True)
+            return self.__package_data(data, column_names, row_format)
         except Exception as e:
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return None
 
+    def iter_all(self, batch_size=None, row_format=None):
+        """
+        流式查询所有数据，使用无缓冲游标(SSCursor)逐行从服务器读取，内存占用与结果集大小无关
+        :param batch_size: None时逐行返回，否则每次返回batch_size行组成的列表
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        - demo:
+            - for row in db.iter_all(): ...
+            - for rows in db.iter_all(batch_size=1000): ...
+        """
+        sql = f"SELECT * FROM {self.table}"
+        return self.__iter_query(sys._getframe().f_code.co_name, sql, batch_size=batch_size, row_format=row_format)
+
+    def iter_select(self, *args, batch_size=None, row_format=None, **kwargs):
+        """
+        根据条件进行流式查询，参数与select相同
+        :param batch_size: None时逐行返回，否则每次返回batch_size行组成的列表
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        - demo:
+            - for row in db.iter_select({"sno": "1"}): ...
+            - for rows in db.iter_select(sno="1", batch_size=1000): ...
+        """
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+
+        values = self.__get_values(obj)
+        sql = self.sql_cache.get("select", self.table, where=obj)
+        return self.__iter_query(sys._getframe().f_code.co_name, sql, values, batch_size, row_format)
+
+    def iter_range(self, column: str, start=None, end=None, batch_size=None, row_format=None):
+        """
+        流式查询 start <= column < end 的数据，start/end为None时表示不限制，参数与iter_all相同
+        - demo:
+            - for rows in db.iter_range("id", 1, 100000, batch_size=1000): ...
+        """
+        conditions = []
+        values = []
+        if start is not None:
+            conditions.append(f"`{column}` >= %s")
+            values.append(start)
+        if end is not None:
+            conditions.append(f"`{column}` < %s")
+            values.append(end)
+        sql = f"SELECT * FROM {self.table}{' WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+        return self.__iter_query(sys._getframe().f_code.co_name, sql, values or None, batch_size, row_format)
+
+    def __get_select_sql(self, args, kwargs):
+        """没有条件时查询全表，否则与select相同"""
+        if not args and not kwargs:
+            return f"SELECT * FROM {self.table}", None
+        self.__validate_args(args, kwargs)
+        obj = args[0] if args else kwargs
+        return self.sql_cache.get("select", self.table, where=obj), self.__get_values(obj)
+
+    def select_columnar(self, *args, batch_size=10000, use_numpy=None, **kwargs):
+        """
+        按列查询数据，适合分析类的大批量读取：结果直接按批解码到每一列的数组中，不会为每一行构造字典
+        - 安装了numpy时返回numpy数组，否则整数/浮点列返回array.array，其他列返回列表
+        - 包含NULL的数值列会退化为object数组/列表
+        :param batch_size: 每次从服务器读取的行数(使用无缓冲游标)
+        :param use_numpy: 是否使用numpy，默认安装了numpy就使用
+        :return: 字典对象，键为列名，值为该列的数组
+        - demo:
+            - columns = db.select_columnar()
+            - columns = db.select_columnar(sno="1", batch_size=50000)
+        """
+        if not batch_size:
+            raise ValueError(f"batch_size must be a positive integer, got {batch_size!r}")
+        sql, values = self.__get_select_sql(args, kwargs)
+        builder: ColumnarBuilder = None
+
+        def batch_factory(description):
+            nonlocal builder
+            builder = ColumnarBuilder(description, use_numpy)
+            return builder.extend
+
+        for _ in self.__iter_query(sys._getframe().f_code.co_name, sql, values, batch_size, batch_factory=batch_factory):
+            pass
+        return builder.build() if builder is not None else {}
+
+    def iter_columnar(self, *args, batch_size=10000, use_numpy=None, **kwargs):
+        """
+        按列流式查询，每次返回batch_size行对应的 {列名: 数组}，参数与select_columnar相同
+        - demo:
+            - for columns in db.iter_columnar(batch_size=100000): ...
+        """
+        if not batch_size:
+            raise ValueError(f"batch_size must be a positive integer, got {batch_size!r}")
+        sql, values = self.__get_select_sql(args, kwargs)
+
+        def batch_factory(description):
+            def to_columns(rows):
+                builder = ColumnarBuilder(description, use_numpy)
+                builder.extend(rows)
+                return builder.build()
+
+            return to_columns
+
+        return self.__iter_query(sys._getframe().f_code.co_name, sql, values, batch_size, batch_factory=batch_factory)
+
+    def iter_pages(self, order_by: str | list | tuple = "id", page_size=1000, start_after: str = None, row_format=None, where: dict = None):
+        """
+        按索引列进行keyset(seek)分页，遍历整张表:
+            - 单列: WHERE `id` > 上一页最后的值 ORDER BY `id` LIMIT page_size
+            - 多列: WHERE (`a` > %s) OR (`a` = %s AND `b` > %s) ORDER BY `a`, `b` LIMIT page_size
+        每一页都是独立的查询，不会像OFFSET一样越翻越慢，也不会在迭代期间一直占用连接
+        :param order_by: 排序列，需要有索引并且唯一(通常是主键)；复合key时传入列名列表
+        :param page_size: 每页的行数
+        :param start_after: 分页游标，从该游标之后继续遍历，None表示从头开始
+        :param row_format: 行格式 dict/tuple/namedtuple/record，默认使用连接的row_format
+        :param where: 可选，额外的等值条件，例如 {"status": 1}
+        :return: 生成器，元素为 (当前页的数据列表, 分页游标)；游标是字符串，保存下来后可以传给start_after继续遍历
+        - demo:
+            - for rows, token in db.iter_pages(order_by="id", page_size=5000): save(token)
+            - for rows, token in db.iter_pages(order_by=["user_id", "order_id"], start_after=token): ...
+        """
+        order_cols = [order_by] if isinstance(order_by, str) else list(order_by)
+        last = decode_token(start_after, order_cols) if start_after is not None else None
+        order_params = ", ".join([f"`{column}`" for column in order_cols])
+        where = where or {}
+        while True:
+            conditions = [f"`{column}` {'is' if value is None else '='} %s" for column, value in where.items()]
+            values = list(where.values())
+            if last is not None:
+                # 展开的OR形式，比行构造器 (`a`, `b`) > (%s, %s) 更容易用上索引
+                seek = []
+                for i, column in enumerate(order_cols):
+                    seek.append("(" + " AND ".join([f"`{c}` = %s" for c in order_cols[:i]] + [f"`{column}` > %s"]) + ")")
+                    values.extend(last[: i + 1])
+                conditions.append("(" + " OR ".join(seek) + ")")
+            sql = f"SELECT * FROM {self.table}{' WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY {order_params} LIMIT {int(page_size)}"
+            data, column_names = self.__fetch_page(sql, values)
+            if not data:
+                return
+            names = [name.lower() for name in column_names]
+            last = [data[-1][names.index(column.lower())] for column in order_cols]
+            yield self.__package_data(list(data), column_names, row_format), encode_token(order_cols, last)
+            if len(data) < page_size:
+                return
+
+    @before_execute
+    def __fetch_page(self, sql, values):
+        try:
+            return self.__query("iter_pages", sql, values, use_cache=False)
+        except Exception as e:
+            self.__print_info("iter_pages", sql=sql, values=values, success=False, error_msg=str(e))
+            raise
+
+    def __iter_query(self, func_name, sql, values=None, batch_size=None, row_format=None, batch_factory=None):
+        """
+        流式查询的公共实现
+        :param batch_factory: 可选，函数(cursor.description) -> 函数(rows)，用于自定义每一批数据的转换方式，需要配合batch_size使用
+        迭代期间会一直持有self.lock，所以不要在循环里用同一个实例执行其他操作
+        如果调用方提前结束迭代(break/异常/close)，未读完的结果不再逐行读取，而是直接断开并重建连接
+        """
+        if self.table is None:
+            raise Exception("table is not set!")
+        row_format = self.__check_row_format(row_format or self.row_format)
+        with self.lock:
+            self.__test_conn()
+            cursor = self.conn.cursor(SSCursor)
+            pending = False  # 服务器端是否还有未读取的结果
+            try:
+                cursor.execute(sql, values)
+                pending = True
+                self.__print_info(func_name, sql=sql, values=values, cursor=cursor)
+                factory = get_row_factory(row_format, tuple([desc[0] for desc in cursor.description]))
+                to_batch = batch_factory(cursor.description) if batch_factory else None
+                if batch_size:
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        if to_batch is not None:
+                            yield to_batch(rows)
+                        else:
+                            yield rows if row_format == "tuple" else [factory(row) for row in rows]
+                else:
+                    for row in cursor:
+                        yield factory(row)
+                pending = False
+            except Exception as e:
+                self.__print_info(func_name, sql=sql, values=values, success=False, error_msg=str(e))
+                raise
+            finally:
+                if not pending or self._in_transaction:  # 事务中不能重建连接，只能读完剩余的数据
+                    cursor.close()
+                else:
+                    # 无缓冲游标关闭时会把剩余的数据全部读完，数据量大时代价很高，直接重建连接
+                    self._log.debug(f"{func_name} stopped early, reconnect to discard the remaining rows")
+                    try:
+                        self.conn.close()
+                    except Exception:
+                        pass
+                    self.conn = self.connect_db()
+
+    @invalidate_cache
     @before_execute
     def update(self, target_obj: dict, new_obj: dict):
         """
@@ -523,20 +1204,131 @@ class WkMysql:
         :return: True/False
         """
         values = self.__get_values(new_obj) + self.__get_values(target_obj)
-        set_params = self.__get_set_params(new_obj)
-        query_params = self.__get_query_params(target_obj)
-        sql = f"UPDATE {self.table} set {set_params} where {query_params}"
+        sql = self.sql_cache.get("update", self.table, where=target_obj, columns=new_obj.keys())
         try:
             with self.get_cursor() as cursor:
                 cursor.execute(sql, values)
-                self.conn.commit()
+                self.__commit()
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
+            return -1
+
+    @invalidate_cache
+    @before_execute
+    def update_many(self, obj_list: list[dict], key: str | list | tuple = "id", batch_size=1000, temp_table_threshold=5000, max_bytes=None):
+        """
+        批量更新，每一行可以更新不同的值(甚至不同的列)，在同一个事务中执行，全部成功或全部回滚
+        按要更新的列分组后，根据每组的行数自动选择:
+            - 行数不超过temp_table_threshold: UPDATE ... SET col = CASE key WHEN ... THEN ... END WHERE key IN (...)，每条语句最多batch_size行
+            - 行数超过temp_table_threshold: 先把数据批量写入临时表，再用一条 UPDATE ... JOIN 临时表 完成更新
+        :param obj_list: 列表，元素为字典对象，包含key列和要更新的列
+        :param key: 用来定位行的列名，复合key时传入列名列表，key的值不能为None
+        同一个key出现多次时，先按顺序合并成一行再分组，同一列以最后一次出现的值为准
+        :return: 实际修改的行数，出错时返回-1(在外层事务中时抛出异常)
+        - demo:
+            - update_many([{"id": 1, "name": "a"}, {"id": 2, "name": "b", "age": 20}])
+            - update_many(rows, key=["user_id", "order_id"])
+        """
+        if not obj_list:
+            self._log.warn("要更新的数据为空!")
+            return 0
+        key_cols = [key] if isinstance(key, str) else list(key)
+        merged: dict[tuple, dict] = {}  # key -> 行，同一个key出现多次时按顺序合并，后面的值覆盖前面的
+        for obj in obj_list:
+            if any([obj.get(column) is None for column in key_cols]):
+                raise Exception(f"key {key_cols} must be set and not None in every row!")
+            merged.setdefault(tuple([obj[column] for column in key_cols]), {}).update(obj)
+        groups: dict[tuple, list] = {}  # 要更新的列 -> 行
+        for obj in merged.values():
+            columns = tuple([column for column in obj.keys() if column not in key_cols])
+            if columns:
+                groups.setdefault(columns, []).append(obj)
+        rowcount = 0
+        try:
+            with self.transaction():
+                for columns, rows in groups.items():
+                    if len(rows) > temp_table_threshold:
+                        rowcount += self.__update_by_temp_table(key_cols, list(columns), rows, max_bytes)
+                    else:
+                        rowcount += self.__update_by_case(key_cols, list(columns), rows, batch_size, max_bytes)
+            return rowcount
+        except Exception as e:
+            self.__print_info(sys._getframe().f_code.co_name, sql=f"UPDATE {self.table} ...", values=f"{len(obj_list)} rows", success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
 
+    def __key_literal(self, key_cols: list, obj: dict):
+        if len(key_cols) == 1:
+            return self.conn.literal(obj[key_cols[0]])
+        return self.__literal_row([obj[column] for column in key_cols])
+
+    def __update_by_case(self, key_cols: list, columns: list, rows: list[dict], batch_size, max_bytes=None):
+        """使用 CASE WHEN 拼接批量更新语句，按batch_size和max_bytes切分"""
+        encoding = self.conn.encoding
+        max_bytes = max_bytes or self.__get_packet_limit()
+        key_params = f"`{key_cols[0]}`" if len(key_cols) == 1 else f"({self.__get_col_params(key_cols)})"
+        # 单列key使用 CASE `id` WHEN 1 THEN ...，复合key使用 CASE WHEN (`a`, `b`) = (1, 2) THEN ...
+        when = "WHEN {} THEN {}" if len(key_cols) == 1 else f"WHEN {key_params} = {{}} THEN {{}}"
+        case = f"CASE {key_params} " if len(key_cols) == 1 else "CASE "
+
+        def build(chunk):
+            set_params = ", ".join([f"`{column}` = {case}{' '.join([when.format(k, values[i]) for k, values in chunk])} ELSE `{column}` END" for i, column in enumerate(columns)])
+            return f"UPDATE {self.table} SET {set_params} WHERE {key_params} IN ({', '.join([k for k, _ in chunk])})"
+
+        rowcount = 0
+        chunk = []
+        size = 0
+        for obj in rows + [None]:
+            if obj is not None:
+                item = (self.__key_literal(key_cols, obj), [self.conn.literal(obj[column]) for column in columns])
+                item_size = len(item[0].encode(encoding)) * (len(columns) + 1) + sum([len(v.encode(encoding)) for v in item[1]]) + len(when) * len(columns)
+            if chunk and (obj is None or len(chunk) == batch_size or size + item_size > max_bytes):
+                sql = build(chunk)
+                with self.get_cursor() as cursor:
+                    cursor.execute(sql)
+                    rowcount += cursor.rowcount
+                    self.__print_info("update_many", sql=f"UPDATE {self.table} SET ... CASE ...", values=f"{len(chunk)} rows, {len(sql)} bytes", cursor=cursor)
+                chunk = []
+                size = 0
+            if obj is not None:
+                chunk.append(item)
+                size += item_size
+        return rowcount
+
+    def __update_by_temp_table(self, key_cols: list, columns: list, rows: list[dict], max_bytes=None):
+        """把数据写入临时表，再通过 UPDATE ... JOIN 更新；CREATE/DROP TEMPORARY TABLE 不会导致事务隐式提交"""
+        tmp = "_wk_update_many"
+        col_params = self.__get_col_params(key_cols + columns)
+        key_params = self.__get_col_params(key_cols)
+        with self.get_cursor() as cursor:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {tmp}")
+            # 从原表复制列类型，并在key上建立主键
+            cursor.execute(f"CREATE TEMPORARY TABLE {tmp} (PRIMARY KEY ({key_params})) SELECT {col_params} FROM {self.table} LIMIT 0")
+        try:
+            prefix = f"INSERT INTO {tmp}({col_params}) VALUES "
+            literals = (self.__literal_row([obj[column] for column in key_cols + columns]) for obj in rows)
+            for sql, row_num, size in self.__iter_chunks(prefix, literals, max_bytes=max_bytes):
+                with self.get_cursor() as cursor:
+                    cursor.execute(sql)
+                    self.__print_info("update_many", sql=prefix, values=f"{row_num} rows, {size} bytes", cursor=cursor)
+            on = " AND ".join([f"t.`{column}` = s.`{column}`" for column in key_cols])
+            set_params = ", ".join([f"t.`{column}` = s.`{column}`" for column in columns])
+            sql = f"UPDATE {self.table} AS t JOIN {tmp} AS s ON {on} SET {set_params}"
+            with self.get_cursor() as cursor:
+                cursor.execute(sql)
+                self.__print_info("update_many", sql=sql, values=f"{len(rows)} rows", cursor=cursor)
+                return cursor.rowcount
+        finally:
+            with self.get_cursor() as cursor:
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {tmp}")
+
+    @invalidate_cache
     @before_execute
     def execute(self, sql, values=None):
         """
@@ -556,13 +1348,18 @@ class WkMysql:
                     cursor.execute(sql)
                 else:
                     cursor.execute(sql, values)
-                self.conn.commit()
+                self.__commit()
+                self.__invalidate(sql=sql)
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
 
+    @invalidate_cache
     @before_execute
     def execute_many(self, sql, values_list):
         """
@@ -578,10 +1375,13 @@ class WkMysql:
         try:
             with self.get_cursor() as cursor:
                 cursor.executemany(sql, values_list)
-                self.conn.commit()
+                self.__commit()
+                self.__invalidate(sql=sql)
                 self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values_list, cursor=cursor)
                 return cursor.rowcount
         except Exception as e:
-            self.conn.rollback()
+            self.__rollback()
             self.__print_info(sys._getframe().f_code.co_name, sql=sql, values=values_list, success=False, error_msg=str(e))
+            if self._in_transaction:
+                raise
             return -1
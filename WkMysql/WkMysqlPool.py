@@ -12,11 +12,16 @@
 """
 
 from .WkMysql import WkMysql
+import math
+import queue
 import time
-from queue import Queue
-from threading import Condition, Lock, Thread
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Condition, Event, Thread
 from contextlib import contextmanager
+from contextvars import ContextVar
 from WkLog import WkLog
+from .PoolStats import PoolMetrics, start_metrics_server, to_prometheus
 
 HOST = "localhost"
 PORT = 3306
@@ -37,6 +42,12 @@ class WkMysqlPool:
         min_conn=3,
         max_conn=10,
         max_idle_timeout=60 * 60,  # 最大空闲超时：1小时
+        validate_after=5,  # 连接空闲超过该时间(秒)后，取出时先ping一次，失败则丢弃并在后台补充新连接；None表示不检查
+        warmup_in_background=False,  # 是否在后台建立初始连接，为True时构造函数立即返回，可以通过wait_ready等待
+        name=None,  # 连接池名称，用于监控指标的标签，默认为 host:port/database
+        scale_interval=5,  # 自动伸缩的采样间隔，单位：秒
+        target_utilization=0.7,  # 自动伸缩的目标利用率(使用中连接数 / 总连接数)
+        scale_smoothing=0.3,  # 指数平滑系数，越大对负载变化越敏感
         **kwargs,
     ):
         self.host = host
@@ -47,27 +58,56 @@ class WkMysqlPool:
         self.max_conn: int = max_conn  # 最大连接数
         self.min_conn: int = min_conn  # 最小连接数
         self.max_idle_timeout: int = max_idle_timeout  # 单位：秒
+        self.validate_after = validate_after
+        self.name = name or f"{host}:{port}/{database}"
+        self.scale_interval = scale_interval
+        self.target_utilization = target_utilization
+        self.scale_smoothing = scale_smoothing
+        self._in_use_ewma = 0.0  # 平滑后的使用中连接数
+        self._waiting_ewma = 0.0  # 平滑后的等待线程数
         self.kwargs = kwargs
 
         self._log = WkLog()
+        self.metrics = PoolMetrics()
 
         self.conditionLock = Condition()
-        self.pool: Queue = self._init_pool()
+        self.waiters: deque[_Waiter] = deque()  # 等待连接的线程，先进先出
+        self.pool: deque = deque()  # 空闲连接 (conn, last_use_time)，后进先出，左端是空闲最久的连接
+        self.current_conn = 0  # 当前连接数(空闲 + 使用中 + 正在创建)
+        self.ready = Event()  # 初始连接建立完成
+        self._bound: ContextVar = ContextVar(f"WkMysqlPool-{id(self)}-bound", default=None)  # 当前线程/协程绑定的连接
 
-        self.current_conn = self.pool.qsize()  # 当前连接数
-        # 启动空闲连接清理线程
-        self.new_thread(self.cleanup_idle_threads)
+        self._init_pool(warmup_in_background)
+        # 启动自动伸缩线程
+        self.new_thread(self.autoscale)
 
-    def _init_pool(self):
-        pool = Queue(self.max_conn)
-        for _ in range(self.min_conn):
-            try:
-                conn = self._create_connection()
-                pool.put((conn, time.time()))  # 初始化最小连接, 同时记录时间戳
-            except Exception as e:
-                self._log.error(f"Failed to create initial connection: {e}")
-                continue
-        return pool
+    def _init_pool(self, background=False):
+        with self.conditionLock:
+            self.current_conn += self.min_conn  # 先为初始连接占位
+        if background:
+            self.new_thread(self._warm_up)
+        else:
+            self._warm_up()
+
+    def _warm_up(self):
+        """并发建立min_conn个初始连接，每建立一个就放入连接池"""
+        if self.min_conn > 0:
+            with ThreadPoolExecutor(max_workers=min(self.min_conn, 16), thread_name_prefix="WkMysqlPool-warmup") as executor:
+                futures = [executor.submit(self._open_connection) for _ in range(self.min_conn)]
+                for future in as_completed(futures):
+                    try:
+                        self.release_connection(future.result())
+                    except Exception as e:
+                        self._log.error(f"Failed to create initial connection: {e}")
+                        self._release_slot()
+        self.ready.set()
+
+    def wait_ready(self, timeout=None):
+        """
+        等待初始连接建立完成(warmup_in_background=True时使用)
+        :return: True/False(超时)
+        """
+        return self.ready.wait(timeout)
 
     def _create_connection(self) -> WkMysql:
         return WkMysql(
@@ -79,66 +119,395 @@ class WkMysqlPool:
             **self.kwargs,
         )
 
-    def _get_connection(self) -> WkMysql:
+    def _open_connection(self) -> WkMysql:
+        """建立连接并记录监控指标"""
+        try:
+            conn = self._create_connection()
+        except Exception:
+            self.metrics.incr("failed")
+            raise
+        self.metrics.incr("created")
+        return conn
+
+    def qsize(self):
+        """空闲连接数"""
+        return len(self.pool)
+
+    def _get_connection(self, timeout=None) -> WkMysql:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waiter = None  # 丢弃失效连接后，可能已经排在队首等待替代连接
+        while True:
+            reserved = False  # 是否占用了一个新的连接名额
+            if waiter is None:
+                with self.conditionLock:
+                    # 有线程在排队时不允许插队，保证先来先得
+                    if not self.waiters and self.pool:
+                        conn, last_use_time = self.pool.pop()  # 后进先出：优先使用刚归还的连接
+                    elif not self.waiters and self.current_conn < self.max_conn:
+                        self.current_conn += 1  # 先占位，在锁外建立连接，避免阻塞其他线程
+                        reserved = True
+                    else:
+                        waiter = _Waiter()
+                        self.waiters.append(waiter)
+            if reserved:
+                return self._create_reserved_connection()
+            if waiter is not None:
+                conn, last_use_time = self._wait(waiter, deadline, timeout)
+                waiter = None
+                if conn is None:  # 有连接被关闭，空出的名额转交给了当前线程
+                    return self._create_reserved_connection()
+            # 在锁外检查连接，避免网络请求阻塞其他线程
+            if self._validate_connection(conn, last_use_time):
+                return conn
+            self._log.debug(f"Discard broken connection: {conn}")
+            waiter = self._discard_connection(conn)
+
+    def _wait(self, waiter: "_Waiter", deadline, timeout):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not waiter.event.wait(remaining):
+            with self.conditionLock:
+                if not waiter.event.is_set():
+                    self.waiters.remove(waiter)
+                    self.metrics.incr("timeouts")
+                    raise TimeoutError(f"Pool exhausted: timed out after {timeout}s waiting for a connection! (max_conn={self.max_conn})")
+        return waiter.conn, waiter.last_use_time
+
+    def _create_reserved_connection(self) -> WkMysql:
+        """已经占用了一个连接名额，创建连接，失败时归还名额"""
+        try:
+            return self._open_connection()
+        except Exception as e:
+            self._log.error(f"Failed to get connection: {e}")
+            self._release_slot()
+            raise
+
+    def _validate_connection(self, conn: WkMysql, last_use_time) -> bool:
+        """取出连接前的检查：空闲时间较短的连接直接使用，否则ping一次"""
+        if conn.close_flag:
+            return False
+        if self.validate_after is None or time.time() - last_use_time < self.validate_after:
+            return True
+        return conn.ping()
+
+    def _discard_connection(self, conn: WkMysql):
+        """
+        关闭失效的连接，名额保留给在后台新建的替代连接，调用方不需要等待重连
+        没有空闲连接时，调用方排在队首等待这个替代连接(或者先归还的其他连接)，而不是自己再新建一个
+        :return: 调用方需要等待的_Waiter，有空闲连接可用时返回None
+        """
+        try:
+            conn.close()
+        except Exception as e:
+            self._log.error(f"Failed to close connection: {e}")
+        self.metrics.incr("closed")
+        waiter = None
         with self.conditionLock:
-            try:
-                while self.pool.empty() and self.current_conn >= self.max_conn:
-                    self.conditionLock.wait()  # 等待连接池中有空闲连接
-                if self.pool.empty():
-                    conn = self._create_connection()
-                    self.current_conn += 1
-                    return conn
-                else:
-                    conn, _ = self.pool.get()
-                    return conn
-            except Exception as e:
-                self._log.error(f"Failed to get connection: {e}")
-                return None
+            if self.waiters or not self.pool:
+                waiter = _Waiter()
+                self.waiters.appendleft(waiter)  # 之前已经排过队，不需要重新排到队尾
+        self.new_thread(self._replace_connection)
+        return waiter
+
+    def _replace_connection(self):
+        """使用失效连接留下的名额在后台新建连接，建好后交给排在最前面的线程或放回连接池"""
+        try:
+            conn = self._create_reserved_connection()  # 失败时归还名额
+        except Exception:
+            return
+        self.release_connection(conn)
+
+    def _add_connection(self):
+        """在后台补充一个新连接(替换失效的连接或扩容)，调用方不需要等待"""
+        with self.conditionLock:
+            if self.current_conn >= self.max_conn:
+                return
+            self.current_conn += 1  # 先占位
+        try:
+            conn = self._create_reserved_connection()
+        except Exception:
+            return
+        self.release_connection(conn)
 
     @contextmanager
-    def get_conn(self):
-        conn = self._get_connection()
+    def get_conn(self, timeout=None):
+        """
+        获取一个连接
+        :param timeout: 最长等待时间(秒)，None表示一直等待，超时抛出TimeoutError
+        - demo:
+            - with pool.get_conn(timeout=3) as conn: ...
+        - 在 pool.bind() 的范围内直接返回绑定的连接，不经过连接池
+        """
+        bound = self._bound.get()
+        if bound is not None:
+            yield bound
+            return
+        start = time.monotonic()
+        conn = self._get_connection(timeout)
+        acquired = time.monotonic()
+        self.metrics.acquire_wait.observe(acquired - start)
+        self.metrics.incr("acquires")
         try:
             yield conn  # 提供连接给调用者
         finally:
             # 在上下文退出后释放连接
+            self.metrics.hold_time.observe(time.monotonic() - acquired)
             self.release_connection(conn)
 
+    @contextmanager
+    def bind(self, timeout=None):
+        """
+        在当前线程/协程中绑定一个连接，范围内所有的 get_conn() 都返回同一个连接，退出范围时自动归还
+        适合一个请求内执行多次小查询的场景，省去每次取还连接的开销，并保留会话状态(临时表、会话变量等)
+        绑定基于contextvars，每个线程、每个asyncio任务互不影响；嵌套调用时复用外层绑定的连接
+        - demo:
+            - with pool.bind():
+                  with pool.get_conn() as conn: ...
+                  with pool.get_conn() as conn: ...  # 同一个连接
+        """
+        bound = self._bound.get()
+        if bound is not None:
+            yield bound
+            return
+        with self.get_conn(timeout) as conn:
+            token = self._bound.set(conn)
+            try:
+                yield conn
+            finally:
+                self._bound.reset(token)
+
+    @contextmanager
+    def transaction(self, timeout=None):
+        """
+        获取一个连接并开启事务，正常退出时提交一次，出现异常时回滚并抛出异常；在 bind() 范围内使用绑定的连接
+        - demo:
+            - with pool.transaction() as conn:
+                  conn.set_table("account").update({"id": 1}, {"balance": 90})
+                  conn.set_table("account").update({"id": 2}, {"balance": 110})
+        """
+        with self.get_conn(timeout) as conn, conn.transaction():
+            yield conn
+
+    def bound_connection(self) -> WkMysql | None:
+        """:return: 当前线程/协程绑定的连接，没有绑定时返回None"""
+        return self._bound.get()
+
     def release_connection(self, conn: WkMysql):
         with self.conditionLock:
+            now = time.time()
+            # 有线程在等待时直接把连接交给排在最前面的线程
+            if self.waiters:
+                self.waiters.popleft().wake(conn, now)
+            else:
+                self.pool.append((conn, now))
+
+    def _release_slot(self):
+        """释放一个连接名额：优先转交给等待的线程，没有等待者时才减少连接数"""
+        with self.conditionLock:
+            if self.waiters:
+                self.waiters.popleft().wake(None, None)
+            else:
+                self.current_conn -= 1
+
+    def close_connections(self, conn):
+        try:
+            conn.close()  # 关闭空闲连接
+        except Exception as e:
+            self._log.error(f"Failed to close connection: {e}")
+        finally:
+            self.metrics.incr("closed")
+            self._release_slot()
+
+    def parallel_scan(self, table, key="id", workers=4, partitions=None, batch_size=10000, row_format=None, callback=None, max_in_flight=None):
+        """
+        并行扫描整张表: 先查询key的MIN/MAX，把 [MIN, MAX] 切分为多个区间，由多个线程各自使用一个连接池中的连接流式读取
+        :param key: 整数类型的索引列(通常是自增主键)
+        :param workers: 并行的线程数，同时占用的连接数不超过该值
+        :param partitions: 区间数量，默认workers * 4，区间多于线程数可以减轻数据分布不均匀的影响
+        :param batch_size: 每次从服务器读取的行数
+        :param callback: 可选，callback(区间序号, rows) 在工作线程中处理每一批数据
+        :param max_in_flight: 不使用callback时，最多缓存多少批已经读取但还没有被消费的数据，默认workers * 2
+        :return:
+            - 不传callback: 生成器，元素为一批数据(列表)，来自不同区间的数据交替返回，顺序不固定；提前结束迭代时会停止所有线程
+            - 传入callback: 扫描结束后返回 {"partitions": 区间数量, "rows": 总行数}；任意区间出错时停止扫描并抛出异常
+        - demo:
+            - for rows in pool.parallel_scan("test_table", key="id", workers=8): ...
+            - pool.parallel_scan("test_table", workers=8, callback=lambda partition, rows: export(partition, rows))
+        """
+        ranges = self._scan_ranges(table, key, partitions or workers * 4)
+        if callback is not None:
+            return self._scan_with_callback(table, key, ranges, workers, batch_size, row_format, callback)
+        return self._scan_stream(table, key, ranges, workers, batch_size, row_format, max_in_flight or workers * 2)
+
+    def _scan_ranges(self, table, key, partitions):
+        """:return: [(start, end), ...]，左闭右开"""
+        with self.get_conn() as conn, conn.lock, conn.get_cursor() as cursor:
+            cursor.execute(f"SELECT MIN(`{key}`), MAX(`{key}`) FROM {table}")
+            low, high = cursor.fetchone()
+        if low is None:
+            return []
+        if not isinstance(low, int) or not isinstance(high, int):
+            raise Exception(f"parallel_scan requires an integer key, `{key}` is {type(low).__name__}")
+        step = max(1, math.ceil((high - low + 1) / partitions))
+        return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+    def _scan_partition(self, table, key, start, end, batch_size, row_format, emit, stop: Event):
+        with self.get_conn() as conn:
+            batches = conn.set_table(table).iter_range(key, start, end, batch_size=batch_size, row_format=row_format)
             try:
-                self.pool.put((conn, time.time()))
-            except Exception as e:
-                self._log.error(f"Failed to release connection: {e}")
+                for rows in batches:
+                    if stop.is_set():
+                        return
+                    emit(rows)
             finally:
-                self.conditionLock.notify()  # 通知其他线程有空闲连接
+                batches.close()  # 提前结束时由iter_range负责丢弃剩余的数据
 
-    def close_connections(self, conn):
-        with self.conditionLock:
+    def _scan_with_callback(self, table, key, ranges, workers, batch_size, row_format, callback):
+        stop = Event()
+        counts = [0] * len(ranges)
+
+        def scan(partition, start, end):
+            def emit(rows):
+                callback(partition, rows)
+                counts[partition] += len(rows)
+
+            self._scan_partition(table, key, start, end, batch_size, row_format, emit, stop)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="WkMysqlPool-scan") as executor:
+            futures = [executor.submit(scan, i, start, end) for i, (start, end) in enumerate(ranges)]
             try:
-                conn.close()  # 关闭空闲连接
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                stop.set()
+                for future in futures:
+                    future.cancel()
+                raise
+        return {"partitions": len(ranges), "rows": sum(counts)}
+
+    def _scan_stream(self, table, key, ranges, workers, batch_size, row_format, max_in_flight):
+        stop = Event()
+        results: queue.Queue = queue.Queue(maxsize=max_in_flight)  # 有界队列，消费者处理不过来时工作线程会等待
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scan(start, end):
+            try:
+                self._scan_partition(table, key, start, end, batch_size, row_format, lambda rows: put(("rows", rows)), stop)
+                put(("done", None))
             except Exception as e:
-                self._log.error(f"Failed to close connection: {e}")
-            finally:
-                self.current_conn -= 1
-                self.conditionLock.notify()
+                put(("error", e))
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="WkMysqlPool-scan")
+        futures = [executor.submit(scan, start, end) for start, end in ranges]
+        try:
+            remaining = len(futures)
+            while remaining:
+                kind, payload = results.get()
+                if kind == "rows":
+                    yield payload
+                elif kind == "done":
+                    remaining -= 1
+                else:
+                    raise payload
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        连接池监控指标快照
+        :return: 字典对象，包括 idle/in_use/total/waiting 等仪表盘，acquires/timeouts/created/closed/failed 等计数器，
+                 以及 acquire_wait/hold_time 两个直方图(单位：秒)
+        """
+        with self.conditionLock:
+            gauges = {
+                "idle": len(self.pool),
+                "in_use": self.current_conn - len(self.pool),
+                "total": self.current_conn,
+                "waiting": len(self.waiters),
+                "max_conn": self.max_conn,
+                "min_conn": self.min_conn,
+            }
+        return self.metrics.snapshot(gauges)
+
+    def prometheus_metrics(self):
+        """:return: Prometheus文本格式的监控指标"""
+        return to_prometheus(self.stats(), {"pool": self.name})
+
+    def start_metrics_server(self, port=9105, host="127.0.0.1"):
+        """
+        在后台线程启动 http://host:port/metrics ，供Prometheus抓取
+        :return: HTTP服务对象，调用shutdown()停止
+        """
+        return start_metrics_server(self.prometheus_metrics, port=port, host=host)
 
     def new_thread(self, func, *args):
         t = Thread(target=func, args=args)
         t.daemon = True
         t.start()
 
-    def cleanup_idle_threads(self):
+    def autoscale(self):
+        """
+        按需伸缩连接池，替代原来每隔max_idle_timeout整体清理一次的做法:
+        - 每隔scale_interval秒采样一次使用中的连接数和等待线程数，并做指数平滑
+        - 期望连接数 = 平滑后的使用中连接数 / target_utilization + 平滑后的等待线程数，限制在[min_conn, max_conn]
+        - 低于期望值时在后台补充连接；高于期望值时从空闲最久的一端原地关闭连接，不会清空连接池
+        - 空闲超过max_idle_timeout的连接无论利用率如何都会被回收(保留min_conn个)
+        """
         while True:
-            time.sleep(self.max_idle_timeout)
-            self._log.debug("cleanup_idle_threads")
-            temp_pool = []
-            while not self.pool.empty():
-                conn, last_use_time = self.pool.get()
-                if time.time() - last_use_time > self.max_idle_timeout and self.current_conn > self.min_conn:
-                    self.close_connections(conn)
-                    self._log.debug(f"Closed idle connection: {conn}")
+            time.sleep(self.scale_interval)
+            try:
+                self._autoscale_once()
+            except Exception as e:
+                self._log.error(f"autoscale failed: {e}")
+
+    def _autoscale_once(self):
+        alpha = self.scale_smoothing
+        expired = []
+        with self.conditionLock:
+            in_use = self.current_conn - len(self.pool)
+            self._in_use_ewma = alpha * in_use + (1 - alpha) * self._in_use_ewma
+            self._waiting_ewma = alpha * len(self.waiters) + (1 - alpha) * self._waiting_ewma
+            desired = math.ceil(self._in_use_ewma / self.target_utilization + self._waiting_ewma)
+            desired = max(self.min_conn, min(self.max_conn, desired))
+
+            grow = desired - self.current_conn
+            now = time.time()
+            surplus = self.current_conn - max(desired, self.min_conn)
+            while self.pool and self.current_conn - len(expired) > self.min_conn:
+                idle_time = now - self.pool[0][1]
+                if idle_time > self.max_idle_timeout or (surplus > len(expired) and idle_time >= self.scale_interval):
+                    expired.append(self.pool.popleft()[0])
                 else:
-                    temp_pool.append((conn, last_use_time))
-            for conn, last_use_time in temp_pool:
-                self.release_connection(conn)
+                    break
+        for _ in range(grow):
+            self.new_thread(self._add_connection)
+        for conn in expired:
+            self.close_connections(conn)
+            self._log.debug(f"Closed idle connection: {conn}")
+        if grow > 0 or expired:
+            self._log.debug(f"autoscale: in_use={self._in_use_ewma:.2f}, waiting={self._waiting_ewma:.2f}, desired={desired}, grow={max(grow, 0)}, shrink={len(expired)}")
+
+
+class _Waiter:
+    """等待连接的线程，conn为None时表示得到的是一个连接名额"""
+
+    __slots__ = ("event", "conn", "last_use_time")
+
+    def __init__(self):
+        self.event = Event()
+        self.conn: WkMysql = None
+        self.last_use_time = None
+
+    def wake(self, conn, last_use_time):
+        self.conn = conn
+        self.last_use_time = last_use_time
+        self.event.set()
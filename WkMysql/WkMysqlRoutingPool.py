@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# @Date     : 2026-10-18 17:02:36
+# @Author   : WANGKANG
+# @Blog     : https://wangkang1717.github.io
+# @Email    : 1686617586@qq.com
+# @Filepath : WkMysqlRoutingPool.py
+# @Brief    : 主从读写分离连接池
+# Copyright 2024 WANGKANG, All Rights Reserved.
+
+"""
+项目地址：https://gitee.com/purify_wang/wk-mysql
+"""
+
+"""
+使用示例
+pool = WkMysqlRoutingPool(
+    primary={"host": "db-primary", "port": 3306, "user": "root", "password": "123456", "database": "myproject"},
+    replicas=[{"host": "db-replica-1"}, {"host": "db-replica-2"}],  # 未填写的参数与primary相同
+    strategy="least_outstanding",
+    read_after_write=1,
+    min_conn=3,
+    max_conn=10,
+)
+with pool.get_conn() as conn:
+    conn.set_table("test_table").insert_row(id=1, name="wk")  # 主库
+    conn.set_table("test_table").select_all()  # 写入后1秒内仍然读主库，之后读从库
+"""
+
+import itertools
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from WkLog import WkLog
+from .WkMysqlPool import WkMysqlPool
+
+ROUTING_STRATEGIES = ("round_robin", "least_outstanding")
+
+
+class WkMysqlRoutingPool:
+    # 发送到从库的方法，其余方法一律发送到主库
+    READ_METHODS = frozenset(["select", "select_one", "select_all", "exists", "get_column_names", "iter_all", "iter_select", "select_columnar", "iter_columnar", "select_in", "iter_pages", "iter_range"])
+    # 发送到主库但不算写入的方法
+    NON_WRITE_METHODS = frozenset(["ping", "get_cursor"])
+
+    def __init__(
+        self,
+        primary: dict,
+        replicas: list[dict] = None,
+        strategy="round_robin",  # 从库选择策略：round_robin(轮询) / least_outstanding(借出连接最少)
+        read_after_write=0,  # 同一线程/协程写入后，该时间(秒)内的读操作仍然发送到主库，0表示不启用
+        **kwargs,  # 传给每个WkMysqlPool的参数，如min_conn/max_conn/time_interval等
+    ):
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"strategy must be one of {ROUTING_STRATEGIES}, got {strategy!r}")
+        self.strategy = strategy
+        self.read_after_write = read_after_write
+        self._log = WkLog()
+
+        self.primary = self.__create_pool(primary, kwargs)
+        self.replicas: list[WkMysqlPool] = [self.__create_pool({**primary, **replica}, kwargs) for replica in replicas or []]
+
+        self._lock = Lock()
+        self._rr = itertools.count()
+        self._outstanding = [0] * len(self.replicas)  # 每个从库当前借出的连接数
+        self._counters = {"reads": 0, "writes": 0, "primary_reads": 0, "replica_failures": 0}
+        self._last_write: ContextVar = ContextVar(f"WkMysqlRoutingPool-{id(self)}-last-write", default=None)
+
+    @staticmethod
+    def __create_pool(params: dict, kwargs: dict) -> WkMysqlPool:
+        """host/user/password/database/port以外的参数(如charset/ssl)都传给WkMysqlPool，优先于公共的kwargs"""
+        extra = {key: value for key, value in params.items() if key not in ("host", "user", "password", "database", "port", "kwargs")}
+        return WkMysqlPool(
+            host=params["host"],
+            user=params["user"],
+            password=params["password"],
+            database=params["database"],
+            port=params.get("port", 3306),
+            **{**kwargs, **extra, **params.get("kwargs", {})},
+        )
+
+    def __release_replica(self, i):
+        with self._lock:
+            self._outstanding[i] -= 1
+
+    def _incr(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _mark_write(self):
+        self._last_write.set(time.monotonic())
+        self._incr("writes")
+
+    def _pinned_to_primary(self):
+        """写入后的read_after_write秒内，读操作也发送到主库，保证能读到自己刚写入的数据"""
+        if not self.read_after_write:
+            return False
+        last_write = self._last_write.get()
+        return last_write is not None and time.monotonic() - last_write < self.read_after_write
+
+    def _replica_order(self):
+        """:return: 按选择策略排序后的从库下标"""
+        n = len(self.replicas)
+        with self._lock:
+            start = next(self._rr) % n
+            order = [(start + i) % n for i in range(n)]
+            if self.strategy == "least_outstanding":
+                order.sort(key=lambda i: self._outstanding[i])  # 稳定排序，借出数相同时按轮询顺序
+        return order
+
+    @contextmanager
+    def get_primary(self, timeout=None):
+        """直接从主库获取一个WkMysql连接"""
+        with self.primary.get_conn(timeout) as conn:
+            yield conn
+
+    @contextmanager
+    def get_replica(self, timeout=None):
+        """
+        按选择策略从从库获取一个WkMysql连接
+        从库获取连接失败时依次尝试其他从库，全部失败或没有配置从库时使用主库
+        """
+        for i in self._replica_order() if self.replicas else []:
+            with ExitStack() as stack:
+                with self._lock:
+                    self._outstanding[i] += 1
+                stack.callback(self.__release_replica, i)
+                try:
+                    conn = stack.enter_context(self.replicas[i].get_conn(timeout))
+                except Exception as e:
+                    self._incr("replica_failures")
+                    self._log.error(f"Get connection from replica {self.replicas[i].name} failed -> {str(e)}")
+                    continue
+                yield conn
+                return
+        with self.get_primary(timeout) as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self, timeout=None):
+        """在主库上开启事务，范围内的读写都发送到主库"""
+        with self.primary.transaction(timeout) as conn:
+            yield conn
+        self._mark_write()
+
+    @contextmanager
+    def get_conn(self, timeout=None):
+        """
+        获取一个按方法自动路由的连接
+        读方法(select*/exists/get_column_names/iter_*)发送到从库，其他方法发送到主库
+        主库和从库的连接都是第一次使用时才获取，退出范围时一起归还
+        - demo:
+            - with pool.get_conn(timeout=3) as conn: ...
+        """
+        with ExitStack() as stack:
+            yield _RoutedConnection(self, stack, timeout)
+
+    def stats(self):
+        """:return: 路由计数器，以及主库和每个从库连接池的监控指标"""
+        with self._lock:
+            counters = dict(self._counters)
+            outstanding = list(self._outstanding)
+        return {
+            **counters,
+            "primary": self.primary.stats(),
+            "replicas": [{"name": pool.name, "outstanding": n, **pool.stats()} for pool, n in zip(self.replicas, outstanding)],
+        }
+
+
+class _RoutedConnection:
+    """按方法名把调用转发到主库或从库连接的代理对象，set_table只记录表名，调用时再设置到实际连接上"""
+
+    def __init__(self, router: WkMysqlRoutingPool, stack: ExitStack, timeout):
+        self._router = router
+        self._stack = stack
+        self._timeout = timeout
+        self._primary = None
+        self._replica = None
+        self.table = None
+
+    def set_table(self, table):
+        self.table = table
+        return self
+
+    def _get_primary(self):
+        if self._primary is None:
+            self._primary = self._stack.enter_context(self._router.get_primary(self._timeout))
+        return self._primary
+
+    def _get_replica(self):
+        if self._replica is None:
+            self._replica = self._stack.enter_context(self._router.get_replica(self._timeout))
+        return self._replica
+
+    @contextmanager
+    def transaction(self):
+        """在主库上开启事务，事务范围内的读操作也发送到主库，才能读到事务中未提交的数据"""
+        with self._get_primary().transaction():
+            yield self
+        self._router._mark_write()
+
+    def __getattr__(self, name):
+        router = self._router
+        is_read = name in router.READ_METHODS
+        in_transaction = self._primary is not None and self._primary._in_transaction
+        if is_read and (in_transaction or router._pinned_to_primary()):
+            router._incr("primary_reads")
+            conn = self._get_primary()
+        elif is_read:
+            conn = self._get_replica()
+        else:
+            conn = self._get_primary()
+        if self.table is not None:
+            conn.set_table(self.table)
+        attr = getattr(conn, name)
+        if not callable(attr):
+            return attr
+        if is_read:
+            router._incr("reads")
+            return attr
+
+        def write(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if name not in router.NON_WRITE_METHODS:
+                router._mark_write()
+            return result
+
+        return write
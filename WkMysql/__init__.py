@@ -1,5 +1,11 @@
 from .WkMysql import WkMysql
 from .WkMysqlPool import WkMysqlPool
+from .WkMysqlRoutingPool import WkMysqlRoutingPool
+from .SqlTemplateCache import SqlTemplateCache
+from .ResultCache import ResultCache
+from .BufferedWriter import BufferedWriter
+from .AsyncWkMysql import AsyncWkMysql
+from .AsyncWkMysqlPool import AsyncWkMysqlPool
 
 __version__ = "1.1.2.2"
-__all__ = ["__version__", "WkMysql", "WkMysqlPool"]
+__all__ = ["__version__", "WkMysql", "WkMysqlPool", "WkMysqlRoutingPool", "AsyncWkMysql", "AsyncWkMysqlPool", "SqlTemplateCache", "ResultCache", "BufferedWriter"]
@@ -30,6 +30,8 @@ PLATFORMS = ["all"]
 INSTALL_REQUIRES = ["pymysql", "WkLog"]
 EXTRAS_REQUIRE = {
     # 'fancy feature': ['django'],
+    "async": ["aiomysql"],
+    "numpy": ["numpy"],
 }
 
 VERSION = ""  # 为空自动加载包内__init__.py文件里的__version__变量
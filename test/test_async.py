@@ -0,0 +1,71 @@
+from WkMysql import AsyncWkMysql, AsyncWkMysqlPool
+import asyncio
+import time
+from WkLog import log
+
+HOST = "localhost"
+PORT = 3306
+USER = "root"
+PASSWORD = "123456"
+DATABASE = "myproject"
+TABLE = "test_table"
+
+
+async def crud_test():
+    async with AsyncWkMysql(host=HOST, port=PORT, user=USER, password=PASSWORD, database=DATABASE) as db:
+        db.set_table(TABLE)
+        await db.create_table(
+            {
+                "id": "INT PRIMARY KEY AUTO_INCREMENT",
+                "key": "varchar(255)",
+                "sno": "varchar(255)",
+                "role": "varchar(255)",
+            },
+            delete_if_exists=False,
+        )
+        print(await db.insert_row({"key": "async", "sno": "1", "role": "1"}))
+        print(await db.select(key="async"))
+        print(await db.update({"key": "async"}, {"role": "2"}))
+        print(await db.exists(key="async", role="2"))
+        print(await db.delete_row(key="async"))
+
+
+async def concurrency_test():
+    dbs = [AsyncWkMysql(host=HOST, port=PORT, user=USER, password=PASSWORD, database=DATABASE) for _ in range(20)]
+
+    async def task(name, db):
+        res = await db.set_table(TABLE).select_all()
+        log.info(f"{name} -> {len(res)}")
+
+    time_start = time.time()
+    await asyncio.gather(*[task(f"task-{i}", db) for i, db in enumerate(dbs)])
+    print("time cost: ", time.time() - time_start)
+    for db in dbs:
+        await db.close()
+
+
+async def pool_test():
+    async with AsyncWkMysqlPool(
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE,
+        max_conn=10,
+        min_conn=3,
+    ) as pool:
+
+        async def task(name):
+            async with pool.acquire(timeout=5) as conn:
+                res = await conn.set_table(TABLE).select_all()
+                log.info(f"{name} -> {pool.qsize()} -> {len(res)} -> {pool.current_conn}")
+
+        time_start = time.time()
+        await asyncio.gather(*[task(f"task-{i}") for i in range(200)])
+        print("time cost: ", time.time() - time_start)
+
+
+if __name__ == "__main__":
+    asyncio.run(crud_test())
+    # asyncio.run(concurrency_test())
+    # asyncio.run(pool_test())
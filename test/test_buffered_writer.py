@@ -0,0 +1,34 @@
+from WkMysql import WkMysqlPool, BufferedWriter
+import threading
+import time
+
+HOST = "localhost"
+PORT = 3306
+USER = "root"
+PASSWORD = "123456"
+DATABASE = "myproject"
+TABLE = "test_table"
+
+
+def buffered_writer_test():
+    pool = WkMysqlPool(host=HOST, port=PORT, user=USER, password=PASSWORD, database=DATABASE, min_conn=2, max_conn=5)
+    writer = BufferedWriter(pool, batch_size=1000, max_latency=0.5)
+
+    def task(name):
+        for i in range(10000):
+            writer.write(TABLE, name=f"{name}-{i}", age=i % 100)
+
+    time_start = time.time()
+    tasks = [threading.Thread(target=task, args=("task-{}".format(i),)) for i in range(8)]
+    for t in tasks:
+        t.start()
+    for t in tasks:
+        t.join()
+    writer.flush()
+    print("time cost: ", time.time() - time_start)
+    print(writer.stats())
+    writer.close()
+
+
+if __name__ == "__main__":
+    buffered_writer_test()
@@ -28,7 +28,7 @@ def multi_thread_test():
     def test_pool(name):
         with pool.get_conn() as conn:
             res = conn.set_table(TABLE).select_all()
-            log.info(f"{name} -> {pool.pool.qsize()} -> {len(res)} -> {pool.current_conn}")
+            log.info(f"{name} -> {pool.qsize()} -> {len(res)} -> {pool.current_conn}")
             return
 
     time_start = time.time()
@@ -66,7 +66,7 @@ def single_thread_test_pool():
     def test_pool(name):
         with pool.get_conn() as conn:
             res = conn.set_table(TABLE).select_all()
-            log.info(f"{name} -> {pool.pool.qsize()} -> {len(res)} -> {pool.current_conn}")
+            log.info(f"{name} -> {pool.qsize()} -> {len(res)} -> {pool.current_conn}")
             return
 
     time_start = time.time()
@@ -83,6 +83,54 @@ def single_thread_test_pool():
     print("time cost: ", time_end - time_start)
 
 
+def bind_test():
+    pool = WkMysqlPool(
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE,
+        max_conn=30,
+        min_conn=10,
+        time_interval=60,
+    )
+
+    def request(name):
+        with pool.bind():
+            for _ in range(10):
+                with pool.get_conn() as conn:
+                    res = conn.set_table(TABLE).select_all()
+            log.info(f"{name} -> {pool.qsize()} -> {len(res)} -> {pool.bound_connection()}")
+
+    time_start = time.time()
+    tasks = [threading.Thread(target=request, args=("task-{}".format(i),)) for i in range(20)]
+    for task in tasks:
+        task.start()
+    for task in tasks:
+        task.join()
+    time_end = time.time()
+    print("time cost: ", time_end - time_start)
+
+
+def parallel_scan_test():
+    pool = WkMysqlPool(
+        host=HOST,
+        port=PORT,
+        user=USER,
+        password=PASSWORD,
+        database=DATABASE,
+        max_conn=10,
+        min_conn=2,
+    )
+
+    for workers in (1, 2, 4, 8):
+        time_start = time.time()
+        total = 0
+        for rows in pool.parallel_scan(TABLE, key="id", workers=workers, batch_size=10000):
+            total += len(rows)
+        print(f"workers={workers} rows={total} time cost: {time.time() - time_start}")
+
+
 def single_thread_test():
     db = WkMysql(
         host=HOST,
@@ -116,3 +164,5 @@ if __name__ == "__main__":
     multi_thread_test()
     # single_thread_test()
     # single_thread_test_pool()
+    # bind_test()
+    # parallel_scan_test()
@@ -0,0 +1,30 @@
+from WkMysql import WkMysql, ResultCache
+import time
+
+HOST = "localhost"
+PORT = 3306
+USER = "root"
+PASSWORD = "123456"
+DATABASE = "myproject"
+TABLE = "test_table"
+
+
+def result_cache_test():
+    cache = ResultCache(max_size=1000, ttl=30)
+    db = WkMysql(host=HOST, port=PORT, user=USER, password=PASSWORD, database=DATABASE, result_cache=cache)
+    db.set_table(TABLE)
+
+    time_start = time.time()
+    for _ in range(1000):
+        db.select_one(id=1)
+        db.exists(id=1)
+    print("time cost: ", time.time() - time_start)
+    print(cache.stats())
+
+    db.update({"id": 1}, {"name": "wangkang"})  # 写操作后缓存失效
+    print(db.select_one(id=1))
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    result_cache_test()
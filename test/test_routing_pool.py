@@ -0,0 +1,38 @@
+from WkMysql import WkMysqlRoutingPool
+import threading
+from WkLog import log
+
+PRIMARY = {
+    "host": "localhost",
+    "port": 3306,
+    "user": "root",
+    "password": "123456",
+    "database": "myproject",
+}
+REPLICAS = [{"port": 3307}, {"port": 3308}]
+TABLE = "test_table"
+
+
+def routing_test():
+    pool = WkMysqlRoutingPool(PRIMARY, REPLICAS, strategy="least_outstanding", read_after_write=1, min_conn=2, max_conn=10)
+
+    def task(name):
+        with pool.get_conn() as conn:
+            conn.set_table(TABLE).insert_row(name=name, age=18)
+            log.info(f"{name} -> read after write -> {conn.select_one(name=name)}")
+        with pool.get_conn() as conn:
+            log.info(f"{name} -> {len(conn.set_table(TABLE).select_all())}")
+
+    tasks = [threading.Thread(target=task, args=("task-{}".format(i),)) for i in range(20)]
+    for t in tasks:
+        t.start()
+    for t in tasks:
+        t.join()
+    stats = pool.stats()
+    print({k: v for k, v in stats.items() if k not in ("primary", "replicas")})
+    for replica in stats["replicas"]:
+        print(replica["name"], replica["acquires"])
+
+
+if __name__ == "__main__":
+    routing_test()
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+from pymysql.constants import CLIENT
+from WkMysql import WkMysql
+
+# 不需要连接数据库: 用假的cursor模拟服务器返回的影响行数和 "Records: N  Duplicates: D" 信息
+
+
+def count_upsert(row_num, affected, message=None, found_rows=False, ignore=False):
+    db = WkMysql.__new__(WkMysql)
+    db.conn = SimpleNamespace(encoding="utf8", client_flag=CLIENT.FOUND_ROWS if found_rows else 0)
+    cursor = SimpleNamespace(rowcount=affected, _result=SimpleNamespace(message=message))
+    res = {"inserted": 0, "updated": 0, "unchanged": 0, "ignored": 0}
+    db._WkMysql__count_upsert(res, cursor, row_num, ignore)
+    return res["inserted"], res["updated"], res["unchanged"], res["ignored"]
+
+
+def upsert_count_test():
+    # 5行: 2行插入、1行更新、2行没有变化
+    assert count_upsert(5, 4, b"Records: 5  Duplicates: 1  Warnings: 0") == (2, 1, 2, 0)
+    assert count_upsert(5, 6, b"Records: 5  Duplicates: 3  Warnings: 0", found_rows=True) == (2, 1, 2, 0)
+    # 全部没有变化
+    assert count_upsert(2, 0, b"Records: 2  Duplicates: 0  Warnings: 0") == (0, 0, 2, 0)
+    assert count_upsert(2, 2, b"Records: 2  Duplicates: 2  Warnings: 0", found_rows=True) == (0, 0, 2, 0)
+    # 单行语句没有Records/Duplicates信息
+    assert count_upsert(1, 1) == (1, 0, 0, 0)
+    assert count_upsert(1, 2) == (0, 1, 0, 0)
+    assert count_upsert(1, 0) == (0, 0, 1, 0)
+    assert count_upsert(1, 1, found_rows=True) == (1, 0, 0, 0)  # 插入和没有变化无法区分，按插入统计
+    assert count_upsert(1, 2, found_rows=True) == (0, 1, 0, 0)
+    # INSERT IGNORE
+    assert count_upsert(5, 3, b"Records: 5  Duplicates: 2  Warnings: 2", ignore=True) == (3, 0, 0, 2)
+    assert count_upsert(1, 0, ignore=True) == (0, 0, 0, 1)
+    assert count_upsert(1, 1, ignore=True) == (1, 0, 0, 0)
+    print("upsert count test passed")
+
+
+if __name__ == "__main__":
+    upsert_count_test()